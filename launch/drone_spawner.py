@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import json
+
+import rclpy
+from rclpy.node import Node
+from ros_gz_interfaces.msg import Entity
+from ros_gz_interfaces.srv import DeleteEntity, SpawnEntity
+
+from ign_assets.spawn import euler_from_quaternion
+from ign_assets.spawner import Spawner
+
+
+class DroneSpawner(Node):
+    """
+    Spawn and remove drones of a running simulation on request.
+
+    ~/spawn takes the drone description as a config file drone entry (JSON)
+    in entity_factory.sdf; entity_factory.name and pose, when set, override
+    its name and position. ~/remove takes the drone name.
+    """
+
+    def __init__(self):
+        super().__init__('drone_spawner')
+        world_name = self.declare_parameter('world_name', 'empty').value
+        flatten = self.declare_parameter('flatten', False).value
+        bridges = self.declare_parameter('bridges', True).value
+        tf_aggregation = self.declare_parameter('tf_aggregation', False).value
+        # Swarm ground truth odometry rate, model rate if 0
+        odom_rate = self.declare_parameter('odom_rate', 0.0).value
+        # Launch config fidelity profile and mesh LOD, model defaults if empty
+        fidelity = self.declare_parameter('fidelity', '').value
+        lod = self.declare_parameter('lod', '').value
+        # Rendered SDF directory, default_output_dir() if empty
+        output_dir = self.declare_parameter('output_dir', '').value
+        self.spawner = Spawner(world_name, flatten=flatten, output_dir=output_dir or None,
+                               bridges=bridges, tf_aggregation=tf_aggregation,
+                               odom_rate=odom_rate or None, fidelity=fidelity or None,
+                               lod=lod or None)
+        self.create_service(SpawnEntity, '~/spawn', self.spawn_callback)
+        self.create_service(DeleteEntity, '~/remove', self.remove_callback)
+
+    def spawn_callback(self, request, response):
+        factory = request.entity_factory
+        try:
+            entry = json.loads(factory.sdf)
+            if not isinstance(entry, dict):
+                raise RuntimeError('Drone description must be a JSON object')
+            if factory.name:
+                entry['name'] = factory.name
+            if factory.pose != type(factory.pose)():
+                p, q = factory.pose.position, factory.pose.orientation
+                entry['xyz'] = [p.x, p.y, p.z]
+                entry['rpy'] = list(euler_from_quaternion(q.x, q.y, q.z, q.w))
+            model = self.spawner.spawn(entry)
+        except Exception as e:
+            # Bad requests (unknown model types, malformed fields, template errors)
+            # fail the request, never the node
+            self.get_logger().error(f'Spawn failed: {e}')
+            response.success = False
+            return response
+
+        self.get_logger().info(f'Spawned {model}')
+        response.success = True
+        return response
+
+    def remove_callback(self, request, response):
+        if request.entity.type not in [Entity.NONE, Entity.MODEL]:
+            self.get_logger().error('Only drone models can be removed')
+            response.success = False
+            return response
+        try:
+            self.spawner.remove(request.entity.name)
+        except Exception as e:
+            self.get_logger().error(f'Remove failed: {e}')
+            response.success = False
+            return response
+
+        self.get_logger().info(f'Removed {request.entity.name}')
+        response.success = True
+        return response
+
+
+def main():
+    rclpy.init()
+    node = DroneSpawner()
+    try:
+        rclpy.spin(node)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        node.spawner.shutdown()
+        node.destroy_node()
+        if rclpy.ok():
+            rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,11 @@
 from launch import LaunchDescription
-from launch_ros.actions import Node
 from launch.actions import DeclareLaunchArgument, OpaqueFunction
 from launch.substitutions import LaunchConfiguration
 
+import ign_assets.bridge
 import ign_assets.bridges
-from ign_assets.model import Model
-import json
+from ign_assets.config import SimulationConfig
+from ign_assets.model import bridge_container, parameter_bridge, swarm_ground_truth, tf_aggregator
 
 #
 # NOT INTENDED TO USE!! USE MODEL AND WORLD BRIDGES INSTEAD.
@@ -17,45 +17,66 @@ import json
 def model_bridges(context, *args, **kwargs):
     config_file = LaunchConfiguration('config_file').perform(context)
 
-    with open(config_file, 'r') as stream:
-        config = json.load(stream)
-        if 'world' not in config:
-            raise RuntimeError('Cannot construct bridges without world in config')
-        world_name = config['world']
+    config = SimulationConfig.load(config_file)
+    world_name = config.world
+    models = config.models
 
-    with open(config_file, 'r') as stream:
-        models = Model.FromConfig(stream)
+    consolidated = LaunchConfiguration('consolidated').perform(context)
+    consolidated = consolidated.lower() in ['true', 't', 'yes', 'y', '1']
+    if consolidated:
+        shards = int(LaunchConfiguration('bridge_shards').perform(context))
+        return consolidated_bridges(world_name, models, shards)
 
     nodes = []
     for model in models:
         bridges, custom_bridges = model.bridges(world_name)
-        nodes.append(Node(
-            package='ros_gz_bridge',
-            executable='parameter_bridge',
-            namespace=model.model_name,
-            output='screen',
-            arguments=[bridge.argument() for bridge in bridges],
-            remappings=[bridge.remapping() for bridge in bridges]
-        ))
+        nodes.append(parameter_bridge(bridges, namespace=model.model_name))
         nodes += custom_bridges
 
-    print(nodes)
+    return nodes
+
+
+def consolidated_bridges(world_name, models, shards=1):
+    # All models bridged by a few parameter_bridge processes sharing one topic table,
+    # custom bridges loaded as components into a single container
+    bridges = []
+    custom_bridges = []
+    for model in models:
+        bridges_, custom_bridges_ = model.bridges(world_name, composable=True)
+        bridges.extend(bridge.namespaced(model.model_name) for bridge in bridges_)
+        custom_bridges.extend(custom_bridges_)
+    bridges = ign_assets.bridge.consolidate(bridges)
+
+    # The pose bridges of every model publish /tf, a single tf_aggregator replaces them
+    tf_bridges = [bridge for bridge in bridges if bridge.ros_topic == '/tf']
+    if len(tf_bridges) > 1:
+        bridges = [bridge for bridge in bridges if bridge.ros_topic != '/tf']
+        model_names = [model.model_name for model in models if not model.tf_aggregation]
+        custom_bridges.append(tf_aggregator(world_name, model_names, composable=True))
+
+    nodes = []
+    for i, shard in enumerate(ign_assets.bridge.split(bridges, shards)):
+        nodes.append(parameter_bridge(shard, name=f'parameter_bridge_{i}'))
+
+    if custom_bridges:
+        nodes.append(bridge_container(custom_bridges))
     return nodes
 
 
 def general_bridges(context, *args, **kwargs):
+    config_file = LaunchConfiguration('config_file').perform(context)
+    config = SimulationConfig.load(config_file)
+
     bridges = [
         ign_assets.bridges.clock()
     ]
 
     nodes = []
-    nodes.append(Node(
-        package='ros_gz_bridge',
-        executable='parameter_bridge',
-        output='screen',
-        arguments=[bridge.argument() for bridge in bridges],
-        remappings=[bridge.remapping() for bridge in bridges]
-    ))
+    nodes.append(parameter_bridge(bridges))
+    if config.tf_aggregation:
+        nodes.append(tf_aggregator(config.world))
+    for stream, rate in config.swarm_ground_truth.items():
+        nodes.append(swarm_ground_truth(config.world, stream, rate))
     return nodes
 
 
@@ -65,6 +86,17 @@ def generate_launch_description():
             'config_file',
             description='YAML configuration file to spawn'
         ),
+        DeclareLaunchArgument(
+            'consolidated',
+            default_value='false',
+            choices=['true', 'false'],
+            description='Bridge all models from a single process instead of one per model'
+        ),
+        DeclareLaunchArgument(
+            'bridge_shards',
+            default_value='1',
+            description='Number of bridge processes used in consolidated mode'
+        ),
         OpaqueFunction(function=general_bridges),
         OpaqueFunction(function=model_bridges)
     ])
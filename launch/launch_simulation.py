@@ -1,20 +1,40 @@
 from ament_index_python.packages import get_package_share_directory
 from launch import LaunchDescription
 from launch.actions import DeclareLaunchArgument, IncludeLaunchDescription, OpaqueFunction, RegisterEventHandler
-from launch.event_handlers import OnProcessExit
+from launch.actions import LogInfo, SetEnvironmentVariable, TimerAction
+from launch.event_handlers import OnProcessExit, OnProcessIO, OnProcessStart
 from launch.launch_description_sources import PythonLaunchDescriptionSource
 from launch.substitutions import LaunchConfiguration
 from launch.actions import ExecuteProcess, EmitEvent
 from launch_ros.actions import Node
-from launch.events import Shutdown
+from launch.events import Shutdown, matches_action
+from launch.events.process import ShutdownProcess
 
-from ign_assets.model import Model
+import ign_assets.bridges
+from ign_assets.config import SimulationConfig
+import ign_assets.farm
+from ign_assets.model import bridge_diagnostics, parameter_bridge, swarm_ground_truth, tf_aggregator
+from ign_assets.monitor import PARTITION_ENVS, READY_MSG
+import ign_assets.spawn
 
 import os
-import json
+import time
 
 
-def simulation(world_name, headless=False, verbose=False, run_on_start=True):
+class LaunchTimeline:
+    # Launch stage timestamps, relative to launch start
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.stages = {}
+
+    def mark(self, stage):
+        self.stages[stage] = time.monotonic() - self.start
+        return LogInfo(msg=f'[launch] {stage}: {self.stages[stage]:.3f} s')
+
+
+def simulation(world_name, headless=False, verbose=False, run_on_start=True,
+               timeline=None, on_ready=None):
     ign_args = []
     if verbose:
         ign_args.append('-v 4')
@@ -36,33 +56,65 @@ def simulation(world_name, headless=False, verbose=False, run_on_start=True):
         launch_arguments={'gz_args': ' '.join(ign_args)}.items())
 
     # Register handler for shutting down ros launch when ign gazebo process exits
-    # monitor_sim.py will run until it can not find the ign gazebo process.
-    # Once monitor_sim.py exits, a process exit event is triggered which causes the
-    # handler to emit a Shutdown event
+    # monitor_sim.py is started with the ign gazebo server PID and waits on it, printing
+    # a readiness message once the world is loaded. Once monitor_sim.py exits, a process
+    # exit event is triggered which causes the handler to emit a Shutdown event
+    # on_ready() actions are launched as soon as the world is loaded
     p = os.path.join(get_package_share_directory('ignition_assets'), 'launch',
                      'monitor_sim.py')
-    monitor_sim_proc = ExecuteProcess(
-        cmd=['python3', p],
-        name='monitor_sim',
-        output='screen',
-    )
-    sim_exit_event_handler = RegisterEventHandler(
-        OnProcessExit(
-            target_action=monitor_sim_proc,
-            on_exit=[
-                EmitEvent(event=Shutdown(reason='Simulation ended'))
-            ]
+    world = os.path.splitext(os.path.basename(world_name))[0]
+    monitoring = []
+
+    def start_monitor(event, context):
+        if monitoring or 'gazebo' not in ' '.join(event.cmd) or 'monitor_sim' in event.action.name:
+            return None
+        monitor_sim_proc = ExecuteProcess(
+            cmd=['python3', p, '--pid', str(event.pid), '--world', world],
+            name='monitor_sim',
+            output='screen',
         )
-    )
+        monitoring.append(monitor_sim_proc)
+        sim_exit_event_handler = RegisterEventHandler(
+            OnProcessExit(
+                target_action=monitor_sim_proc,
+                on_exit=[
+                    EmitEvent(event=Shutdown(reason='Simulation ended'))
+                ]
+            )
+        )
+        sim_ready_event_handler = RegisterEventHandler(
+            OnProcessIO(
+                target_action=monitor_sim_proc,
+                on_stdout=world_loaded
+            )
+        )
+        actions = [sim_exit_event_handler, sim_ready_event_handler, monitor_sim_proc]
+        if timeline:
+            actions.insert(0, timeline.mark('server up'))
+        return actions
 
-    return [ign_gazebo]    
-    return [ign_gazebo, monitor_sim_proc, sim_exit_event_handler]    
+    def world_loaded(event):
+        if READY_MSG not in event.text.decode():
+            return None
+        actions = []
+        if timeline:
+            actions.append(timeline.mark('world loaded'))
+        if on_ready:
+            actions.extend(on_ready())
+        return actions
 
+    sim_start_event_handler = RegisterEventHandler(OnProcessStart(on_start=start_monitor))
 
-def spawn(world_name, models):
+    return [sim_start_event_handler, ign_gazebo]
+
+
+def spawn(world_name, models, batch=False, on_spawned=None, flatten=False, output_dir=None):
     if type(models) != list:
         models = [models]
 
+    if batch:
+        return spawn_batch(world_name, models, on_spawned, flatten, output_dir)
+
     # ros2 run ros_gz_sim create -world ARG -file FILE 
     launch_processes = []
     for model in models:
@@ -70,18 +122,177 @@ def spawn(world_name, models):
             package='ros_gz_sim',
             executable='create',
             output='screen',
-            arguments=model.spawn_args(world_name)
+            arguments=model.spawn_args(world_name, flatten=flatten, output_dir=output_dir)
         )
         launch_processes.append(ignition_spawn_entity)
 
-    return launch_processes
+    return on_all_exited(launch_processes, on_spawned) + launch_processes
+
+
+def on_all_exited(processes, callback):
+    # Event handlers launching callback() actions once every process has exited
+    if not callback:
+        return []
+    pending = set(processes)
+
+    def on_exit(event, context):
+        pending.discard(event.action)
+        if not pending:
+            return callback()
+        return None
+
+    return [RegisterEventHandler(OnProcessExit(target_action=process, on_exit=on_exit))
+            for process in processes]
+
+
+def spawn_batch(world_name, models, on_spawned=None, flatten=False, output_dir=None):
+    # Render all models on a worker pool and spawn them with create_multiple requests,
+    # a single one unless the swarm exceeds the argv size limit
+    t_render = time.monotonic()
+    model_sdfs = ign_assets.spawn.generate_models(models, flatten=flatten, output_dir=output_dir)
+    t_render = time.monotonic() - t_render
+    if not models:
+        return on_spawned() if on_spawned else []
+
+    spawn_processes = [
+        ExecuteProcess(cmd=cmd, name=f'spawn_models_{i}', output='screen')
+        for i, cmd in enumerate(ign_assets.spawn.create_multiple_cmds(world_name, models,
+                                                                      model_sdfs))]
+
+    # Per stage timing breakdown, from the first request sent to the last one answered
+    t_start = []
+
+    def on_start(event, context):
+        if not t_start:
+            t_start.append(time.monotonic())
+
+    def on_spawned_timed():
+        elapsed = time.monotonic() - t_start[0]
+        actions = [LogInfo(msg=f'[spawn] spawn {len(models)} models: {elapsed:.3f} s')]
+        return actions + (on_spawned() if on_spawned else [])
+
+    return [
+        LogInfo(msg=f'[spawn] render {len(models)} models: {t_render:.3f} s'),
+        *[RegisterEventHandler(OnProcessStart(target_action=process, on_start=on_start))
+          for process in spawn_processes],
+        *on_all_exited(spawn_processes, on_spawned_timed),
+        *spawn_processes
+    ]
+
+
+def world_bridges(config, timeline=None):
+    bridges = [
+        ign_assets.bridges.clock()
+    ]
+    world_bridges = parameter_bridge(bridges, namespace='world')
+    nodes = []
+    if config.tf_aggregation:
+        # Drone poses onto /tf and /tf_static from a single node
+        nodes.append(tf_aggregator(config.world))
+    for stream, rate in config.swarm_ground_truth.items():
+        nodes.append(swarm_ground_truth(config.world, stream, rate))
+    if not timeline:
+        return [world_bridges, *nodes]
+
+    bridges_up = RegisterEventHandler(
+        OnProcessStart(target_action=world_bridges,
+                       on_start=lambda event, context: [timeline.mark('bridges up')]))
+    return [bridges_up, world_bridges, *nodes]
+
+
+def drone_bridges(world_name, models, nodes_by_name):
+    # Bridge nodes of every drone, kept by drone name so they can be restarted alone
+    nodes = []
+    for model in models:
+        bridges, custom_bridges = model.bridges(world_name)
+        nodes_by_name[model.model_name] = [
+            parameter_bridge(bridges, namespace=model.model_name), *custom_bridges]
+        nodes.extend(nodes_by_name[model.model_name])
+    return nodes
+
+
+def apply_changes(world_name, config, diff, batch=False, flatten=False, output_dir=None,
+                  bridge_nodes=None):
+    # Remove changed and removed drones, then render and spawn changed and added ones.
+    # Drone bridges, if launched here, are only restarted for those drones
+    actions = [LogInfo(msg=f'[watch] {diff}')]
+    for name in diff.removed + diff.changed:
+        for node in (bridge_nodes or {}).pop(name, []):
+            actions.append(EmitEvent(event=ShutdownProcess(process_matcher=matches_action(node))))
+
+    removals = [ExecuteProcess(cmd=ign_assets.spawn.remove_cmd(world_name, name),
+                               name=f'remove_{name}', output='screen')
+                for name in diff.removed + diff.changed]
+    models = [config[name] for name in diff.added + diff.changed]
+
+    def respawn():
+        if not models:
+            return []
+        on_spawned = None
+        if bridge_nodes is not None:
+            on_spawned = lambda: drone_bridges(world_name, models, bridge_nodes)
+        return spawn(world_name, models, batch, on_spawned, flatten, output_dir)
+
+    if not removals:
+        return actions + respawn()
+    return actions + on_all_exited(removals, respawn) + removals
+
+
+def watch_config(config_file, load, applied, period=1.0, **kwargs):
+    # Poll the config file and apply each change to the running simulation,
+    # iteration time scales with the change instead of the swarm size
+    state = {'config': applied, 'mtime': os.stat(config_file).st_mtime_ns}
+
+    def check(context):
+        actions = [TimerAction(period=period, actions=[OpaqueFunction(function=check)])]
+        try:
+            mtime = os.stat(config_file).st_mtime_ns
+        except OSError:
+            return actions
+        if mtime == state['mtime']:
+            return actions
+        state['mtime'] = mtime
+
+        try:
+            config = load()
+            diff = config.diff(state['config'])
+        except Exception as e:
+            return [LogInfo(msg=f'[watch] {config_file} not applied: {e}'), *actions]
+        if diff.world_changed:
+            return [LogInfo(msg=f'[watch] world {config.world} or its settings changed, '
+                                'relaunch to apply them'), *actions]
+        state['config'] = config
+        if not diff:
+            return actions
+        return apply_changes(config.world, config, diff, **kwargs) + actions
+
+    return TimerAction(period=period, actions=[OpaqueFunction(function=check)])
+
+
+def drone_spawner(world_name, flatten=False, bridges=True, tf_aggregation=False,
+                  odom_rate=None, fidelity=None, lod=None, output_dir=None):
+    # Runtime spawn/remove services, see drone_spawner.py
+    p = os.path.join(get_package_share_directory('ignition_assets'), 'launch',
+                     'drone_spawner.py')
+    cmd = ['python3', p, '--ros-args',
+           '-p', f'world_name:={world_name}',
+           '-p', f'flatten:={str(flatten).lower()}',
+           '-p', f'bridges:={str(bridges).lower()}',
+           '-p', f'tf_aggregation:={str(tf_aggregation).lower()}',
+           '-p', f'odom_rate:={float(odom_rate or 0.0)}']
+    if fidelity:
+        cmd.extend(['-p', f'fidelity:={fidelity}'])
+    if lod:
+        cmd.extend(['-p', f'lod:={lod}'])
+    if output_dir:
+        # Instance mode, drones spawned at runtime render into the instance directory
+        cmd.extend(['-p', f'output_dir:={output_dir}'])
+    return ExecuteProcess(
+        cmd=cmd,
+        name='drone_spawner',
+        output='screen'
+    )
 
-def world_bridges():
-    world_bridges = IncludeLaunchDescription(
-    PythonLaunchDescriptionSource([os.path.join(
-        get_package_share_directory('ignition_assets'), 'launch'),
-        '/world_bridges.py']))
-    return [world_bridges]
 
 def launch_simulation(context, *args, **kwargs):
     config_file = LaunchConfiguration('config_file').perform(context)
@@ -91,22 +302,85 @@ def launch_simulation(context, *args, **kwargs):
     verbose = verbose.lower() in ['true', 't', 'yes', 'y', '1']
     run_on_start = LaunchConfiguration('run_on_start').perform(context)
     run_on_start = run_on_start.lower() in ['true', 't', 'yes', 'y', '1']
+    batch_spawn = LaunchConfiguration('batch_spawn').perform(context)
+    batch_spawn = batch_spawn.lower() in ['true', 't', 'yes', 'y', '1']
+    flatten_models = LaunchConfiguration('flatten_models').perform(context)
+    flatten_models = flatten_models.lower() in ['true', 't', 'yes', 'y', '1']
+    launch_drone_bridges = LaunchConfiguration('drone_bridges').perform(context)
+    launch_drone_bridges = launch_drone_bridges.lower() in ['true', 't', 'yes', 'y', '1']
+    watch = LaunchConfiguration('watch').perform(context)
+    watch = watch.lower() in ['true', 't', 'yes', 'y', '1']
+    spawner = LaunchConfiguration('spawner').perform(context)
+    spawner = spawner.lower() in ['true', 't', 'yes', 'y', '1']
+    diagnostics = LaunchConfiguration('bridge_diagnostics').perform(context)
+    diagnostics = diagnostics.lower() in ['true', 't', 'yes', 'y', '1']
+    diagnostics_file = LaunchConfiguration('diagnostics_file').perform(context)
+    diagnostics_lazy = LaunchConfiguration('diagnostics_lazy').perform(context)
+    diagnostics_lazy = diagnostics_lazy.lower() in ['true', 't', 'yes', 'y', '1']
 
-    with open(config_file, 'r') as stream:
-        config = json.load(stream)
-        if 'world' not in config:
-            raise RuntimeError('Cannot construct bridges without world in config')
-        world_name = config['world']
+    fidelity = LaunchConfiguration('fidelity').perform(context)
+    lod = LaunchConfiguration('lod').perform(context)
+    instance = LaunchConfiguration('instance').perform(context)
+    domain_id = LaunchConfiguration('domain_id').perform(context)
 
-    with open(config_file, 'r') as stream:
-        models = Model.FromConfig(stream)
+    # Instance mode: own transport partition, ROS domain and output directory, so
+    # several simulations run side by side on one host (see ign_assets.farm)
+    instance_env = []
+    output_dir = None
+    if instance:
+        instance_env = [SetEnvironmentVariable(env, instance) for env in PARTITION_ENVS]
+        output_dir = os.getenv('IGN_ASSETS_OUTPUT_DIR') or \
+            ign_assets.farm.instance_output_dir(instance)
+    if domain_id:
+        instance_env.append(SetEnvironmentVariable('ROS_DOMAIN_ID', domain_id))
 
-    launch_processes = []
+    def load():
+        config = SimulationConfig.load(config_file)
+        if fidelity:
+            config.set_fidelity(fidelity)
+        if lod:
+            config.set_lod(lod)
+        return config
+
+    config = load()
+    world_name = config.world
+    models = config.models
+
+    # Staged launch: server up -> world loaded -> models spawned -> bridges up
+    # Each stage starts once the previous one is ready
+    timeline = LaunchTimeline()
+
+    bridge_nodes = {} if launch_drone_bridges else None
+
+    def on_spawned():
+        actions = [timeline.mark('models spawned'),
+                   *world_bridges(config, timeline)]
+        if launch_drone_bridges:
+            actions += drone_bridges(world_name, models, bridge_nodes)
+        if diagnostics and models:
+            actions.append(bridge_diagnostics(world_name, models, diagnostics_file,
+                                              lazy=diagnostics_lazy))
+        if spawner:
+            actions.append(drone_spawner(world_name, flatten_models,
+                                         tf_aggregation=config.tf_aggregation,
+                                         odom_rate=config.odom_rate,
+                                         fidelity=config.fidelity, lod=config.lod,
+                                         output_dir=output_dir))
+        if watch:
+            actions.append(watch_config(config_file, load, config, batch=batch_spawn,
+                                        flatten=flatten_models, output_dir=output_dir,
+                                        bridge_nodes=bridge_nodes))
+        return actions
 
-    launch_processes.extend(simulation(world_name, headless, verbose, run_on_start))
-    launch_processes.extend(spawn(world_name, models))
-    launch_processes.extend(world_bridges())
-    return launch_processes
+    # Models are rendered now, only spawn requests wait for the world
+    spawn_processes = spawn(world_name, models, batch_spawn, on_spawned, flatten_models,
+                            output_dir)
+
+    def on_ready():
+        return spawn_processes
+
+    return instance_env + simulation(world_name, headless, verbose, run_on_start, timeline,
+                                     on_ready)
 
 
 def generate_launch_description():
@@ -130,5 +404,62 @@ def generate_launch_description():
             default_value='true',
             choices= ['true', 'false'],
             description='Run simulation on start.'),
+        DeclareLaunchArgument(
+            'batch_spawn',
+            default_value='false',
+            choices= ['true', 'false'],
+            description='Render models in parallel and spawn them with a single request.'),
+        DeclareLaunchArgument(
+            'flatten_models',
+            default_value='false',
+            choices= ['true', 'false'],
+            description='Spawn self-contained model SDFs, with model:// includes expanded.'),
+        DeclareLaunchArgument(
+            'fidelity',
+            default_value='',
+            choices= ['', 'low', 'medium', 'high'],
+            description='Sensor fidelity profile, overrides the config file one if given.'),
+        DeclareLaunchArgument(
+            'lod',
+            default_value='',
+            choices= ['', 'low', 'medium', 'high'],
+            description='Mesh level of detail, overrides the config file one if given.'),
+        DeclareLaunchArgument(
+            'drone_bridges',
+            default_value='false',
+            choices= ['true', 'false'],
+            description='Launch drone bridges here instead of from each platform launch.'),
+        DeclareLaunchArgument(
+            'watch',
+            default_value='false',
+            choices= ['true', 'false'],
+            description='Apply config file changes to the running simulation, only changed drones are respawned.'),
+        DeclareLaunchArgument(
+            'spawner',
+            default_value='false',
+            choices= ['true', 'false'],
+            description='Start the drone_spawner services to add and remove drones at runtime.'),
+        DeclareLaunchArgument(
+            'bridge_diagnostics',
+            default_value='false',
+            choices= ['true', 'false'],
+            description='Report rate, bandwidth, latency and drops of every drone bridge on /diagnostics.'),
+        DeclareLaunchArgument(
+            'diagnostics_file',
+            default_value='',
+            description='Bridge diagnostics output file, CSV rows per period if *.csv, JSON run totals otherwise.'),
+        DeclareLaunchArgument(
+            'diagnostics_lazy',
+            default_value='false',
+            choices= ['true', 'false'],
+            description='Also watch lazy bridges (images, point clouds), which keeps their streams running.'),
+        DeclareLaunchArgument(
+            'instance',
+            default_value='',
+            description='Instance name, isolates the simulation in its own transport partition.'),
+        DeclareLaunchArgument(
+            'domain_id',
+            default_value='',
+            description='ROS domain ID of the simulation, inherited from the environment if empty.'),
         OpaqueFunction(function=launch_simulation),
     ])
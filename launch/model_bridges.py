@@ -1,37 +1,29 @@
 from launch import LaunchDescription
-from launch_ros.actions import Node
 from launch.actions import DeclareLaunchArgument, OpaqueFunction, LogInfo, Shutdown
 from launch.substitutions import LaunchConfiguration
 
-from ign_assets.model import Model
-import json
+from ign_assets.config import SimulationConfig
+from ign_assets.model import bridge_container, parameter_bridge
 
 
 def model_bridges(context, *args, **kwargs):
     drone_id = LaunchConfiguration('drone_id').perform(context)
     config_file = LaunchConfiguration('config_file').perform(context)
+    use_container = LaunchConfiguration('use_container').perform(context)
+    use_container = use_container.lower() in ['true', 't', 'yes', 'y', '1']
 
-    with open(config_file, 'r') as stream:
-        config = json.load(stream)
-        if 'world' not in config:
-            raise RuntimeError('Cannot construct bridges without world in config')
-        world_name = config['world']
-
-    with open(config_file, 'r') as stream:
-        models = Model.FromConfig(stream)
+    config = SimulationConfig.load(config_file)
+    world_name = config.world
 
     nodes = []
-    for model in models:
-        if model.model_name == drone_id:
-            bridges, custom_bridges = model.bridges(world_name)
-            nodes.append(Node(
-                package='ros_gz_bridge',
-                executable='parameter_bridge',
-                namespace=model.model_name,
-                output='screen',
-                arguments=[bridge.argument() for bridge in bridges],
-                remappings=[bridge.remapping() for bridge in bridges]
-            ))
+    model = config.get(drone_id)
+    if model:
+        bridges, custom_bridges = model.bridges(world_name, composable=use_container)
+        nodes.append(parameter_bridge(bridges, namespace=model.model_name))
+        if use_container and custom_bridges:
+            # No idle container process for drones without custom bridges
+            nodes.append(bridge_container(custom_bridges, namespace=model.model_name))
+        elif not use_container:
             nodes += custom_bridges
 
     if not nodes:
@@ -52,5 +44,11 @@ def generate_launch_description():
             'drone_id',
             description='Drone ID to create bridges'
         ),
+        DeclareLaunchArgument(
+            'use_container',
+            default_value='false',
+            choices=['true', 'false'],
+            description='Load custom bridges as components into a single container'
+        ),
         OpaqueFunction(function=model_bridges)
     ])
@@ -14,26 +14,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import codecs
-import subprocess
+import argparse
+import os
+import sys
+import threading
 import time
 
+from ign_assets.monitor import READY_MSG, WORLD_TIMEOUT, find_server_pid, wait_for_exit, \
+    wait_for_world
+
+
+def notify_ready(world_name, timeout=WORLD_TIMEOUT):
+    if wait_for_world(world_name, timeout):
+        print(READY_MSG, flush=True)
+        return
+    # Models would never be spawned, the simulation is shut down instead
+    print(f'World {world_name} not loaded within {timeout} s, stopping', file=sys.stderr,
+          flush=True)
+    os._exit(1)
+
+
+def monitor_sim(pid=None, world_name=None, world_timeout=WORLD_TIMEOUT):
+    # look for ign gazebo process if pid is not given
+    while pid is None:
+        pid = find_server_pid()
+        if pid is None:
+            time.sleep(0.5)
+
+    # readiness is reported from a thread, so server exit is never missed
+    if world_name:
+        threading.Thread(target=notify_ready, args=(world_name, world_timeout),
+                         daemon=True).start()
 
-def monitor_sim():
-    # wait a few secs before starting to pgrep for process
-    time.sleep(10)
-    quit = False
     # monitor ign gazebo process until it exits
-    while not quit:
-        time.sleep(1)
-        process = subprocess.Popen(['pgrep', '-f', 'ign gazebo -v 4'],
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        stdout = process.communicate()[0]
-        str_output = codecs.getdecoder('unicode_escape')(stdout)[0]
-        if len(str_output) == 0:
-            quit = True
+    wait_for_exit(pid)
 
 
 if __name__ == '__main__':
-    monitor_sim()
+    parser = argparse.ArgumentParser(description='Monitor ignition gazebo server')
+    parser.add_argument('--pid', type=int, default=None, help='Gazebo server PID')
+    parser.add_argument('--world', default=None,
+                        help=f'World name, print "{READY_MSG}" once it is loaded')
+    parser.add_argument('--world-timeout', type=float, default=WORLD_TIMEOUT,
+                        help='Seconds to wait for the world to load, exit with an error after')
+    args = parser.parse_args()
+
+    monitor_sim(args.pid, args.world, args.world_timeout)
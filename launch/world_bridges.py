@@ -1,7 +1,7 @@
 from launch import LaunchDescription
-from launch_ros.actions import Node
 
 import ign_assets.bridges
+from ign_assets.model import parameter_bridge
 
 
 def generate_launch_description():
@@ -9,12 +9,5 @@ def generate_launch_description():
         ign_assets.bridges.clock()
     ]
     return LaunchDescription([
-        Node(
-            package='ros_gz_bridge',
-            executable='parameter_bridge',
-            namespace='world',
-            output='screen',
-            arguments=[bridge.argument() for bridge in bridges],
-            remappings=[bridge.remapping() for bridge in bridges]
-        )
+        parameter_bridge(bridges, namespace='world')
     ])
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+# Launch-time benchmark: config -> models -> rendered SDFs -> bridges.
+# Runs without a simulator, results are written as JSON. Needs a sourced ROS 2 environment:
+# ign_assets.model imports ament_index_python, launch_ros and rosidl_runtime_py.
+#
+#   python3 scripts/benchmark_launch.py --sizes 1 10 100 1000 --output launch_benchmark.json
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(SCRIPTS_DIR, '..')
+MODELS_DIR = os.path.join(REPO_DIR, 'models')
+
+# Isolated SDF cache, must be set before ign_assets.cache creates its default cache
+os.environ['IGN_ASSETS_CACHE_DIR'] = tempfile.mkdtemp(prefix='ign_assets_bench_')
+
+try:
+    import ign_assets.bridge
+    import ign_assets.cache
+    import ign_assets.render
+except ImportError:
+    sys.path.insert(0, os.path.join(REPO_DIR, 'src'))
+    import ign_assets.bridge
+    import ign_assets.cache
+    import ign_assets.render
+try:
+    from ign_assets.config import SimulationConfig
+    from ign_assets.model import Model
+except ImportError as e:
+    sys.exit(f'{e}: source a ROS 2 environment before running the benchmark')
+
+MODEL_TYPES = ['quadrotor_base', 'hexrotor_base']
+SENSORS = ['hd_camera', 'vga_camera', 'rgbd_camera', 'lidar_3d', 'planar_lidar', 'gps',
+           'semantic_camera']
+
+
+def synthetic_config(n_drones):
+    # Mixed payloads: drone i carries i % 4 sensors, cycling over every sensor type
+    drones = []
+    for i in range(n_drones):
+        payload = {}
+        for j in range(i % 4):
+            sensor = SENSORS[(i + j) % len(SENSORS)]
+            payload[f'{sensor}_{j}'] = {'sensor': sensor, 'xyz': [0.0, 0.0, 0.1 * j]}
+        drones.append({
+            'model': MODEL_TYPES[i % len(MODEL_TYPES)],
+            'name': f'drone_{i}',
+            'xyz': [3.0 * i, 0.0, 0.2],
+            'rpy': [0, 0, 0],
+            'flight_time': 60 if i % 2 else 0,
+            'payload': payload
+        })
+    return {'world': 'empty', 'drones': drones}
+
+
+def load_script(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'mean': statistics.mean(times), 'repeat': repeat}
+
+
+def bench_size(n_drones, repeat, cli_samples):
+    parse_json = load_script('parse_json')
+    config_dir = tempfile.mkdtemp(prefix='ign_assets_bench_config_')
+    config_file = os.path.join(config_dir, f'config_{n_drones}.json')
+    with open(config_file, 'w') as f:
+        json.dump(synthetic_config(n_drones), f)
+
+    def from_config():
+        with open(config_file, 'r') as stream:
+            return Model.FromConfig(stream)
+
+    def iter_config():
+        with open(config_file, 'r') as stream:
+            return list(Model.IterConfig(stream))
+
+    def simulation_config():
+        with open(config_file, 'r') as stream:
+            return SimulationConfig.FromStream(stream).models
+
+    models = from_config()
+    env_dir = os.path.join(MODELS_DIR, '..')
+
+    def render(flatten=False):
+        for model in models:
+            template = os.path.join(MODELS_DIR, model.model_type, f'{model.model_type}.sdf.jinja')
+            ign_assets.render.render(template, env_dir, model.model_name,
+                                     ign_assets.render.payload_sensors(model.payload),
+                                     battery=model.flight_time, flatten=flatten)
+
+    def bridges():
+        return [model.bridges('empty')[0] for model in models]
+
+    # Per-bridge parameter_bridge arguments and remappings
+    model_bridges = bridges()
+
+    def bridge_arguments():
+        for bridges_ in model_bridges:
+            for bridge in bridges_:
+                bridge.argument()
+                bridge.remapping()
+
+    def bridge_config():
+        for bridges_ in model_bridges:
+            ign_assets.bridge.write_config(bridges_, os.path.join(config_dir, 'bridges.yaml'))
+
+    results = {
+        'from_config': measure(from_config, repeat),
+        'iter_config': measure(iter_config, repeat),
+        'simulation_config': measure(simulation_config, repeat),
+        'render': measure(render, repeat),
+        'render_flatten': measure(lambda: render(flatten=True), repeat),
+        'bridges': measure(bridges, repeat),
+        'bridge_arguments': measure(bridge_arguments, repeat),
+        'bridge_config': measure(bridge_config, repeat),
+        'parse_json': measure(lambda: parse_json.main(config_file), repeat),
+        'parse_json_cli': measure(lambda: subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS_DIR, 'parse_json.py'), config_file],
+            stdout=subprocess.DEVNULL, check=True), repeat),
+    }
+
+    # Model.generate needs the installed package share directory
+    # Rendered SDFs go to a directory of their own, removed afterwards
+    with tempfile.TemporaryDirectory(prefix='ign_assets_bench_output_') as output_dir:
+        try:
+            results['generate'] = measure(
+                lambda: [model.generate(use_cache=False, output_dir=output_dir)
+                         for model in models], repeat)
+            ign_assets.cache.default_cache().clear()
+            results['generate_cache_cold'] = measure(
+                lambda: [model.generate(output_dir=output_dir) for model in models], 1)
+            results['generate_cache_warm'] = measure(
+                lambda: [model.generate(output_dir=output_dir) for model in models], repeat)
+        except Exception as e:
+            results['generate'] = {'error': str(e)}
+
+    # jinja_gen.py is timed on a sample of drones, one process per drone
+    sample = models[:cli_samples]
+
+    def jinja_gen_cli():
+        for model in sample:
+            template = os.path.join(MODELS_DIR, model.model_type, f'{model.model_type}.sdf.jinja')
+            sensors = ' '.join(f"{s['name']} {s['model']} {s['pose']}"
+                               for s in ign_assets.render.payload_sensors(model.payload))
+            subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'jinja_gen.py'), template,
+                            env_dir, '--namespace', model.model_name, '--sensors', sensors,
+                            '--stdout'], stdout=subprocess.DEVNULL, check=True)
+
+    cli = measure(jinja_gen_cli, 1)
+    results['jinja_gen_cli_per_drone'] = {k: v / max(len(sample), 1) if k != 'repeat' else v
+                                          for k, v in cli.items()}
+    results['jinja_gen_cli_per_drone']['samples'] = len(sample)
+
+    shutil.rmtree(config_dir)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Launch-time benchmark, needs ROS 2 but no simulator')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000],
+                        help='number of drones of each synthetic config')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions per measurement')
+    parser.add_argument('--cli-samples', type=int, default=10,
+                        help='drones rendered through jinja_gen.py per size')
+    parser.add_argument('--output', default='launch_benchmark.json', help='JSON output file')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'unit': 'seconds',
+        },
+        'results': {}
+    }
+    for n_drones in args.sizes:
+        print(f'Benchmarking {n_drones} drones...', flush=True)
+        report['results'][str(n_drones)] = bench_size(n_drones, args.repeat, args.cli_samples)
+
+    shutil.rmtree(os.environ['IGN_ASSETS_CACHE_DIR'])
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
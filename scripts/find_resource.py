@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+
+try:
+    import ign_assets.resources
+except ImportError:
+    # Running from the source tree without the package installed
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    import ign_assets.resources
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Look up resources in IGN_GAZEBO_RESOURCE_PATH, prints one path per name")
+    parser.add_argument('kind', choices=['model', 'world', 'template'],
+                        help="model directory, world sdf file or model jinja template")
+    parser.add_argument('names', nargs='+', help="resource names")
+    args = parser.parse_args()
+
+    index = ign_assets.resources.default_index()
+    find = {'model': index.find_model,
+            'world': index.find_world,
+            'template': index.find_template}[args.kind]
+
+    found = True
+    for name in args.names:
+        path = find(name)
+        if path is None:
+            print(f'{args.kind} {name} not found in resource path', file=sys.stderr)
+            found = False
+        print(path or '')
+    sys.exit(0 if found else 1)
@@ -1,20 +1,24 @@
 #!/usr/bin/env python3
 
-import jinja2
 import argparse
+import json
 import os
-import shutil
+import sys
+
+try:
+    import ign_assets.cache
+    import ign_assets.render
+except ImportError:
+    # Running from the source tree without the package installed
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    import ign_assets.cache
+    import ign_assets.render
 
 
 def get_namespace():
     return os.getenv('AEROSTACK2_SIMULATION_DRONE_ID', default='drone_sim')
 
 
-def get_file_contents(filepath):
-    with open(filepath, 'rb') as f:
-        return f.read()
-
-
 def str2bool(v):
     if v.lower() in ('yes', 'true', 't', 'y', '1'):
         return True
@@ -24,18 +28,6 @@ def str2bool(v):
         raise argparse.ArgumentTypeError('Boolean value expected.')
 
 
-def get_sensors(sensors_array):
-    sensors = []
-    while sensors_array and sensors_array[0]:
-        name = sensors_array.pop(0)
-        model = sensors_array.pop(0)
-        pose, sensors_array = sensors_array[:6], sensors_array[6:]
-
-        sensors.append({'name': name, 'model': model,
-                        'pose': f'{pose[0]} {pose[1]} {pose[2]} {pose[3]} {pose[4]} {pose[5]}'})
-    return sensors
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -47,18 +39,46 @@ if __name__ == "__main__":
     parser.add_argument('--namespace', default=get_namespace(),
                         help="Drone ROS namespace")
     parser.add_argument('--sensors', default='', help="Drone model sensors")
+    parser.add_argument('--sensor-params', default='{}',
+                        help="JSON fidelity overrides by sensor name, e.g. " +
+                        "'{\"front_cam\": {\"update_rate\": 5, \"resolution\": [320, 240]}}'")
     parser.add_argument('--no-odom', action='store_false',
                         dest="odom", help="Disable odometry plugin on model")
     parser.add_argument('--battery', dest='bat_capacity', default=0.0,
                         help='Enable battery plugin on model with given capacity')
+    parser.add_argument('--fidelity', default=None, choices=['low', 'medium', 'high'],
+                        help="sensor fidelity profile, model defaults if not given")
+    parser.add_argument('--flatten', action='store_true', default=False,
+                        help="expand model:// includes into a single self-contained sdf")
+    parser.add_argument('--lod', default=None, choices=['low', 'medium', 'high'],
+                        help="mesh level of detail, implies --flatten, original meshes if not given")
+    parser.add_argument('--odom-rate', type=float, default=None,
+                        help="odometry publisher rate bound in Hz, model default if not given")
+    parser.add_argument('--cache', action='store_true', default=False,
+                        help="reuse rendered sdf from the cache, copied to the output file")
+    parser.add_argument('--cache-dir', default=None,
+                        help="cache directory, defaults to $IGN_ASSETS_CACHE_DIR or ~/.cache")
     args = parser.parse_args()
-    env = jinja2.Environment(loader=jinja2.FileSystemLoader(args.env_dir))
-    template = env.get_template(os.path.relpath(args.filename, args.env_dir))
 
-    sensors = get_sensors(str(args.sensors).split(sep=' '))
-    d = {'namespace': args.namespace, 'sensors': sensors, 'odom_plugin': args.odom,
-         'battery_plugin': bool(float(args.bat_capacity)), 'capacity': float(args.bat_capacity)}
-    result = template.render(d)
+    if args.output_file:
+        # Per instance output directories may not exist yet
+        os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+
+    sensors = ign_assets.render.get_sensors(str(args.sensors).split(sep=' '),
+                                            json.loads(args.sensor_params))
+
+    if args.cache and not args.stdout:
+        cache = ign_assets.cache.SdfCache(args.cache_dir)
+        # Written to the output file, not linked: later writes to it must never reach the cache
+        filename_cached = cache.render(args.filename, args.env_dir, args.namespace, sensors,
+                                       args.odom, args.bat_capacity, args.fidelity, args.flatten,
+                                       args.lod, args.odom_rate, args.output_file)
+        print(('{:s} -> {:s}'.format(args.filename, filename_cached)))
+        sys.exit(0)
+
+    result = ign_assets.render.render(args.filename, args.env_dir, args.namespace, sensors,
+                                      args.odom, args.bat_capacity, args.fidelity, args.flatten,
+                                      args.lod, args.odom_rate)
 
     if args.stdout:
         print(result)
@@ -72,21 +92,5 @@ if __name__ == "__main__":
             filename_out = args.filename.replace('.sdf.jinja', '.sdf')
             assert filename_out != args.filename, "Not allowed to overwrite template"
 
-        # Overwrite protection mechanism: after generation, the file will be copied to a "last_generated" file.
-        # In the next run, we can check whether the target file is still unmodified.
-        filename_out_last_generated = filename_out + '.last_generated'
-
-        if os.path.exists(filename_out) and os.path.exists(filename_out_last_generated):
-            # Check whether the target file is still unmodified.
-            if get_file_contents(filename_out).strip() != get_file_contents(filename_out_last_generated).strip():
-                raise Exception("ERROR: generation would overwrite changes to `{}`. ".format(filename_out) +
-                                "Changes should only be made to the template file `{}`. ".format(args.filename) +
-                                "Remove `{}` ".format(os.path.basename(filename_out)) +
-                                "(after extracting your changes) to disable this overwrite protection.")
-
-        with open(filename_out, 'w') as f_out:
-            print(('{:s} -> {:s}'.format(args.filename, filename_out)))
-            f_out.write(result)
-
-        # Copy the contents to a "last_generated" file for overwrite protection check next time.
-        shutil.copy(filename_out, filename_out_last_generated)
+        print(('{:s} -> {:s}'.format(args.filename, filename_out)))
+        ign_assets.render.write_sdf(result, filename_out, args.filename)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import argparse
+import glob
+import os
+import sys
+
+try:
+    import ign_assets.lod
+except ImportError:
+    # Running from the source tree without the package installed
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    import ign_assets.lod
+
+
+def mesh_files(paths):
+    # COLLADA files given directly, or found in <model>/meshes of models directories
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+        else:
+            files.extend(sorted(glob.glob(os.path.join(path, '*', 'meshes', '*.dae'))))
+            files.extend(sorted(glob.glob(os.path.join(path, 'meshes', '*.dae'))))
+    return files
+
+
+def size(filepath):
+    return f'{os.path.getsize(filepath) / 1024:.0f} KB'
+
+
+if __name__ == "__main__":
+    default_models = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+    parser = argparse.ArgumentParser(
+        description="Write LOD variants of COLLADA meshes, the ones used by jinja_gen.py --lod")
+    parser.add_argument('paths', nargs='*', default=[default_models],
+                        help="mesh files, model or models directories")
+    parser.add_argument('--lod', nargs='+', default=['low', 'medium'],
+                        choices=[lod for lod in ign_assets.lod.LODS if ign_assets.lod.LODS[lod]],
+                        help="levels of detail to write")
+    parser.add_argument('--binary', action='store_true', default=False,
+                        help="also write binary STL variants, without materials")
+    parser.add_argument('--convex', action='store_true', default=False,
+                        help="also write convex hull collision proxies (needs trimesh)")
+    parser.add_argument('--output-dir', default=None,
+                        help="LOD directory, defaults to $IGN_ASSETS_CACHE_DIR/lod or ~/.cache")
+    args = parser.parse_args()
+
+    files = mesh_files(args.paths)
+    if not files:
+        print(f'No meshes found in {" ".join(args.paths)}', file=sys.stderr)
+        sys.exit(1)
+
+    for filepath in files:
+        print(f'{filepath} ({size(filepath)})')
+        lo, hi = ign_assets.lod.bounds(filepath)
+        print('  box: ' + ' '.join(f'{h - l:.4g}' for l, h in zip(lo, hi)))
+        for lod in args.lod:
+            variant = ign_assets.lod.mesh_file(filepath, lod, args.output_dir)
+            print(f'  {lod}: {variant} ({size(variant)})')
+            if args.binary:
+                variant = ign_assets.lod.mesh_file(filepath, lod, args.output_dir, binary=True)
+                print(f'  {lod}: {variant} ({size(variant)})')
+        if args.convex:
+            try:
+                variant = ign_assets.lod.convex_file(filepath, args.output_dir)
+            except RuntimeError as e:
+                print(e, file=sys.stderr)
+                sys.exit(1)
+            print(f'  convex: {variant} ({size(variant)})')
@@ -1,7 +1,19 @@
 #!/usr/bin/python3
 
-import json
 import argparse
+import base64
+import json
+import os
+import sys
+
+try:
+    import ign_assets.fidelity
+    import ign_assets.stream
+except ImportError:
+    # Running from the source tree without the package installed
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    import ign_assets.fidelity
+    import ign_assets.stream
 
 
 def get_battery_capacity(flight_time):
@@ -37,6 +49,7 @@ def get_drone(drone):
         capacity = get_battery_capacity(flight_time)
 
     payload = ""
+    sensor_params = {}
     if 'payload' in drone:
         for sensor_name, sensor in drone['payload'].items():
             if 'sensor' not in sensor:
@@ -52,32 +65,36 @@ def get_drone(drone):
                 roll_s, pitch_s, yaw_s = sensor['rpy']
 
             payload += f":{sensor_name}:{sensor_type}:{x_s}:{y_s}:{z_s}:{roll_s}:{pitch_s}:{yaw_s}"
-        
-    return f"{model}:{name}:{x}:{y}:{z}:{yaw}:{capacity}{payload}"
+
+            params = ign_assets.fidelity.sensor_params(sensor)
+            if params:
+                sensor_params[sensor_name] = params
+
+    # jinja_gen.py --sensor-params JSON, base64 encoded so it holds no ':' nor spaces
+    params = 'none'
+    if sensor_params:
+        params = base64.b64encode(json.dumps(sensor_params).encode()).decode()
+
+    return f"{model}:{name}:{x}:{y}:{z}:{yaw}:{capacity}:{params}{payload}"
 
 def main(filepath):
     try:
         json_data = open(filepath)
-        data = json.load(json_data)
-        json_data.close()
     except FileNotFoundError:
         print("File not found.")
         exit(-1)
 
+    # Drones are parsed one at a time, only their output lines are kept
+    # Missing drones are left empty, the caller fills in its default drone
     world = 'none'
-    if 'world' in data:
-        world = data['world']
-
-    drones = "none:none:0:0:0:0"
-    if 'drones' in data:
-        drones = data['drones']
-    else:
-        return world, drones
-
     drone_ = []
-    for drone in drones:
-        drone_ += [get_drone(drone)]
-    
+    with json_data:
+        for key, value in ign_assets.stream.iter_members(json_data):
+            if key == 'world':
+                world = value
+            elif key == 'drones':
+                drone_ += [get_drone(value)]
+
     return world, drone_
 
 if __name__ == "__main__":
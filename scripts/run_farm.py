@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+
+try:
+    import ign_assets.farm
+except ImportError:
+    # Running from the source tree without the package installed
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    import ign_assets.farm
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run simulation configs as isolated headless instances side by side")
+    parser.add_argument('configs', nargs='+', help="launch config files, one instance each")
+    parser.add_argument('--cores-per-instance', type=int, default=2,
+                        help="cores pinned to each instance, sets how many run at once")
+    parser.add_argument('--output-dir', default=None,
+                        help="farm directory, one subdirectory per instance with its log")
+    parser.add_argument('--first-domain-id', type=int, default=1,
+                        help="ROS domain ID of the first slot, next slots count up from it")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="seconds after which an instance is stopped, counted as finished")
+    parser.add_argument('--name', default=None,
+                        help="farm name, prefix of the instance partitions")
+    parser.add_argument('--launch-arg', action='append', default=[], dest='launch_args',
+                        help="extra launch_simulation.py argument, e.g. lod:=low, repeatable")
+    args = parser.parse_args()
+
+    farm = ign_assets.farm.Farm(args.configs, args.cores_per_instance, args.output_dir,
+                                args.first_domain_id, args.timeout, args.launch_args, args.name)
+    print(f'[farm] {len(args.configs)} configs on {len(farm.slots)} slots, '
+          f'output in {farm.output_dir}', flush=True)
+
+    results = farm.run()
+    failed = [r for r in results if r['returncode'] != 0 and not r['timed_out']]
+    for result in failed:
+        print(f"[farm] {result['name']} failed, see {result['output_dir']}/launch.log",
+              file=sys.stderr)
+    sys.exit(1 if failed else 0)
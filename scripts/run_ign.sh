@@ -9,27 +9,13 @@ function setup() {
 	export IGN_GAZEBO_RESOURCE_PATH=$IGN_GAZEBO_RESOURCE_PATH:$AS2_MODELS:$AS2_WORLDS
 }
 
-function get_path() {
-	target=$1
-	path_list=$2
+function find_resource() {
+	# Look up a model, world or template in IGN_GAZEBO_RESOURCE_PATH, from an index
+	# built once and cached on disk
+	kind=$1
+	name=$2
 
-	# Check all paths in path_list for specified model
-	IFS_bak=$IFS
-	IFS=":"
-	for possible_path in ${path_list}; do
-		if [ -z $possible_path ]; then
-			continue
-		fi
-		# trim \r from path
-		possible_path=$(echo $possible_path | tr -d '\r')
-		if test -f "${possible_path}/${target}" ; then
-			path=$possible_path
-			break
-		fi
-	done
-	IFS=$IFS_bak
-
-	echo $path
+	python3 ${DIR_SCRIPT}/find_resource.py ${kind} ${name} 2>/dev/null
 }
 
 function parse_config_script() {
@@ -58,7 +44,7 @@ function parse_config_script() {
 		y=${UAV_Y:="0.0"}
 		z=${UAV_Z:="0.0"}
 		yaw=${UAV_YAW:="1.57"}
-		drones_array="${model}:${name}:${x}:${y}:${z}:${yaw}"
+		drones_array="${model}:${name}:${x}:${y}:${z}:${yaw}:0:none"
 	fi
 }
 
@@ -83,7 +69,8 @@ function spawn_drone_model() {
     z=$6
     Y=$7
 	capacity=$8
-	sensors=${@:9}  # All next arguments
+	params=$9
+	sensors=${@:10}  # All next arguments
 	
 	N=${N:=0}
 	model=${model:=""}
@@ -93,8 +80,15 @@ function spawn_drone_model() {
 	z=${z:=0.1}
 	Y=${Y:=0.0}
 	capacity=${capacity:=""}
+	params=${params:="none"}
 	sensors=${sensors:=""}
 
+	# Sensor fidelity overrides, base64 encoded JSON from parse_json.py
+	sensor_params="{}"
+	if [ "$params" != "none" ]; then
+		sensor_params=$(echo "${params}" | base64 -d)
+	fi
+
 	if [ "$model" == "" ] || [ "$model" == "none" ]; then
 		echo "empty model, setting iris as default"
 		model="$DEFAULT_UAV_MODEL"
@@ -108,12 +102,11 @@ function spawn_drone_model() {
 	world_name=${world_path##*/}
 	world_name=${world_name%.*}
 
-	target="${model}/${model}.sdf"
-	modelpath="$(get_path ${target} ${IGN_GAZEBO_RESOURCE_PATH})"
     DIR_SCRIPT="${0%/*}"
-    python3 ${DIR_SCRIPT}/jinja_gen.py ${modelpath}/${target}.jinja ${modelpath}/.. --namespace "${name}" --sensors "${sensors}" --battery "${capacity}" --output-file /tmp/${model}_${N}.sdf
+	template="$(find_resource template ${model})"
+    python3 ${DIR_SCRIPT}/jinja_gen.py ${template} ${template%/*/*}/.. --cache --namespace "${name}" --sensors "${sensors}" --sensor-params "${sensor_params}" --battery "${capacity}" --output-file ${IGN_ASSETS_OUTPUT_DIR:-/tmp}/${model}_${N}.sdf
 
-    ros2 run ros_gz_sim create -world ${world_name} -file /tmp/${model}_${N}.sdf -name "${name}" -x $x -y $y -z $z -Y $Y
+    ros2 run ros_gz_sim create -world ${world_name} -file ${IGN_ASSETS_OUTPUT_DIR:-/tmp}/${model}_${N}.sdf -name "${name}" -x $x -y $y -z $z -Y $Y
 }
 
 function start_ign_server() {
@@ -129,14 +122,11 @@ function start_ign_server() {
 	if [[ -f $world ]]; then
 		world_path="$world"
 	else
-		target="${world}.sdf"
-		world_path="$(get_path ${target} ${IGN_GAZEBO_RESOURCE_PATH})"
+		world_path="$(find_resource world ${world})"
 	fi
 
 	# Check if world_path exist, else empty
-	if [[ -d $world_path ]]; then
-		world_path="${world_path}/${target}"
-	else
+	if [[ ! -f $world_path ]]; then
 		echo "empty world, setting empty.sdf as default"
 		world_path="empty.sdf"
 	fi
@@ -145,6 +135,21 @@ function start_ign_server() {
 	SERVER_PID=$!
 }
 
+function wait_ign_server() {
+	world_name=${world_path##*/}
+	world_name=${world_name%.*}
+
+	# Block until the world publishes its first stats message, it is loaded by then
+	# Gives up after WORLD_TIMEOUT seconds, the server may have failed to start
+	world_timeout=${WORLD_TIMEOUT:=120}
+	if ! timeout ${world_timeout} ign topic -e -t /world/${world_name}/stats -n 1 > /dev/null; then
+		echo "world ${world_name} not loaded within ${world_timeout} s, stopping" >&2
+		kill ${SERVER_PID} 2>/dev/null
+		exit 1
+	fi
+	echo "[$(date +%T.%N)] world ${world_name} loaded"
+}
+
 function start_ign_client() {
 	ign gazebo -g >/dev/null 2>/dev/null &
 	CLIENT_PID=$!
@@ -186,6 +191,7 @@ fi
 
 config_path="$1"
 config_path=${config_path:="none"}
+DIR_SCRIPT="${0%/*}"
 
 # RUN ON START
 if [[ -n "$RUN_ON_START" ]]; then
@@ -210,9 +216,10 @@ echo drones: ${drones[*]}
 echo world_path: $world_path
 
 start_ign_server $world_path
-sleep 1
+wait_ign_server
 
 spawn_drones $drones
+echo "[$(date +%T.%N)] drones spawned"
 
 start_ign_client
 
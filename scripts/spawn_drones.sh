@@ -9,27 +9,13 @@ function setup() {
 	export IGN_GAZEBO_RESOURCE_PATH=$IGN_GAZEBO_RESOURCE_PATH:$AS2_MODELS:$AS2_WORLDS
 }
 
-function get_path() {
-	target=$1
-	path_list=$2
+function find_resource() {
+	# Look up a model, world or template in IGN_GAZEBO_RESOURCE_PATH, from an index
+	# built once and cached on disk
+	kind=$1
+	name=$2
 
-	# Check all paths in path_list for specified model
-	IFS_bak=$IFS
-	IFS=":"
-	for possible_path in ${path_list}; do
-		if [ -z $possible_path ]; then
-			continue
-		fi
-		# trim \r from path
-		possible_path=$(echo $possible_path | tr -d '\r')
-		if test -f "${possible_path}/${target}" ; then
-			path=$possible_path
-			break
-		fi
-	done
-	IFS=$IFS_bak
-
-	echo $path
+	python3 ${DIR_SCRIPT}/find_resource.py ${kind} ${name} 2>/dev/null
 }
 
 function parse_config_script() {
@@ -54,7 +40,7 @@ function parse_config_script() {
 		y=${UAV_Y:="0.0"}
 		z=${UAV_Z:="0.0"}
 		yaw=${UAV_YAW:="1.57"}
-		drones_array="${model}:${x}:${y}:${z}:${yaw}"
+		drones_array="${model}:none:${x}:${y}:${z}:${yaw}:0:none"
 	fi
 }
 
@@ -73,11 +59,12 @@ function parse_drone_config() {
 function spawn_drone_model() {
     N=$1
     model=$2
-    x=$3
-    y=$4
-    z=$5
-    Y=$6
-	sensors=${@:7}  # All next arguments
+    x=$4
+    y=$5
+    z=$6
+    Y=$7
+	params=$9
+	sensors=${@:10}  # All next arguments, name ($3) and capacity ($8) are not used
 	
 	N=${N:=0}
 	model=${model:=""}
@@ -85,8 +72,15 @@ function spawn_drone_model() {
 	y=${y:=$((3*${N}))}
 	z=${z:=0.1}
 	Y=${Y:=0.0}
+	params=${params:="none"}
 	sensors=${sensors:=""}
 
+	# Sensor fidelity overrides, base64 encoded JSON from parse_json.py
+	sensor_params="{}"
+	if [ "$params" != "none" ]; then
+		sensor_params=$(echo "${params}" | base64 -d)
+	fi
+
 	if [ "$model" == "" ] || [ "$model" == "none" ]; then
 		echo "empty model, setting iris as default"
 		model="$DEFAULT_UAV_MODEL"
@@ -95,12 +89,11 @@ function spawn_drone_model() {
 	world_name=${world_path##*/}
 	world_name=${world_name%.*}
 
-	target="${model}/${model}.sdf"
-	modelpath="$(get_path ${target} ${IGN_GAZEBO_RESOURCE_PATH})"
     DIR_SCRIPT="${0%/*}"
-    python3 ${DIR_SCRIPT}/jinja_gen.py ${modelpath}/${target}.jinja ${modelpath}/.. --namespace "${AEROSTACK2_SIMULATION_DRONE_ID::-1}${N}" --sensors "${sensors}" --output-file /tmp/${model}_${N}.sdf
+	template="$(find_resource template ${model})"
+    python3 ${DIR_SCRIPT}/jinja_gen.py ${template} ${template%/*/*}/.. --cache --namespace "${AEROSTACK2_SIMULATION_DRONE_ID::-1}${N}" --sensors "${sensors}" --sensor-params "${sensor_params}" --output-file ${IGN_ASSETS_OUTPUT_DIR:-/tmp}/${model}_${N}.sdf
 
-    ros2 run ros_gz_sim create -world ${world_name} -file /tmp/${model}_${N}.sdf -name ${AEROSTACK2_SIMULATION_DRONE_ID::-1}${N} -x $x -y $y -z $z -Y $Y
+    ros2 run ros_gz_sim create -world ${world_name} -file ${IGN_ASSETS_OUTPUT_DIR:-/tmp}/${model}_${N}.sdf -name ${AEROSTACK2_SIMULATION_DRONE_ID::-1}${N} -x $x -y $y -z $z -Y $Y
 }
 
 function spawn_drones() {
@@ -0,0 +1,561 @@
+#include <algorithm>
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <cstring>
+#include <deque>
+#include <fstream>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "rclcpp/rclcpp.hpp"
+#include "rclcpp/serialized_message.hpp"
+#include "rclcpp_components/register_node_macro.hpp"
+
+#include "diagnostic_msgs/msg/diagnostic_array.hpp"
+#include "diagnostic_msgs/msg/diagnostic_status.hpp"
+#include "diagnostic_msgs/msg/key_value.hpp"
+
+#include <google/protobuf/descriptor.h>
+#include <google/protobuf/message.h>
+#include <ignition/msgs.hh>
+#include <ignition/transport.hh>
+
+#include "ignition_node.hpp"
+
+namespace ignition_assets {
+
+// Bridge diagnostics: every bridge is watched on its Gazebo and ROS sides, reporting
+// message rate, bandwidth, latency (wall time since the simulation step the message
+// is stamped with) and drops (input side messages missing on the output side).
+// Bridges are given as parallel arrays, see ign_assets.model.bridge_diagnostics.
+// Output topics shared by several bridges (e.g. /tf) are reported once, with the drops
+// of all their bridges, as bridges cannot be told apart there.
+// Both sides of every given bridge are subscribed to, which activates lazy bridges, so
+// they are only given on request (lazy argument of bridge_diagnostics).
+class BridgeDiagnostics : public rclcpp::Node {
+public:
+  explicit BridgeDiagnostics(const rclcpp::NodeOptions &options = rclcpp::NodeOptions())
+      : Node("bridge_diagnostics", options) {
+    this->declare_parameter<std::string>("world_name");
+    this->get_parameter("world_name", world_name_);
+
+    std::vector<std::string> drones, ign_topics, ros_topics, ros_types, directions;
+    std::vector<bool> stamped;
+    this->declare_parameter<std::vector<std::string>>("drones");
+    this->get_parameter("drones", drones);
+    this->declare_parameter<std::vector<std::string>>("ign_topics");
+    this->get_parameter("ign_topics", ign_topics);
+    this->declare_parameter<std::vector<std::string>>("ros_topics");
+    this->get_parameter("ros_topics", ros_topics);
+    this->declare_parameter<std::vector<std::string>>("ros_types");
+    this->get_parameter("ros_types", ros_types);
+    this->declare_parameter<std::vector<std::string>>("directions");
+    this->get_parameter("directions", directions);
+    this->declare_parameter<std::vector<bool>>("stamped");
+    this->get_parameter("stamped", stamped);
+
+    this->declare_parameter<double>("period", 1.0);
+    this->get_parameter("period", period_);
+    this->declare_parameter<double>("max_latency", 0.1);
+    this->get_parameter("max_latency", max_latency_);
+    this->declare_parameter<std::string>("output_file", "");
+    this->get_parameter("output_file", output_file_);
+
+    size_t n = drones.size();
+    if (ign_topics.size() != n || ros_topics.size() != n || ros_types.size() != n ||
+        directions.size() != n || stamped.size() != n) {
+      throw std::invalid_argument("Bridge parameter arrays must have the same length");
+    }
+
+    diagnostics_pub_ = this->create_publisher<diagnostic_msgs::msg::DiagnosticArray>(
+        "/diagnostics", rclcpp::QoS(10));
+
+    // Initialize the ignition node, clock ticks map simulation stamps to wall time
+    std::string clock_topic = "/world/" + world_name_ + "/clock";
+    ign_node_->Subscribe(clock_topic, &BridgeDiagnostics::ignitionClockCallback, this);
+
+    entries_.resize(n);
+    std::map<std::string, std::vector<size_t>> by_ign_topic, by_ros_topic, by_output;
+    for (size_t i = 0; i < n; i++) {
+      Entry &entry    = entries_[i];
+      entry.drone     = drones[i];
+      entry.ign_topic = ign_topics[i];
+      entry.ros_topic = ros_topics[i];
+      entry.direction = directions[i];
+      entry.stamped   = stamped[i];
+      by_ign_topic[entry.ign_topic].push_back(i);
+      by_ros_topic[entry.ros_topic].push_back(i);
+      if (entry.direction == "GZ_TO_ROS") {
+        by_output[entry.ros_topic].push_back(i);
+      } else if (entry.direction == "ROS_TO_GZ") {
+        by_output[entry.ign_topic].push_back(i);
+      }
+    }
+
+    for (const auto &output : by_output) {
+      if (output.second.size() < 2) {
+        continue;
+      }
+      const Entry &first = entries_[output.second.front()];
+      Entry group;
+      group.drone     = "*";
+      group.ign_topic = first.direction == "ROS_TO_GZ" ? first.ign_topic : "*";
+      group.ros_topic = first.direction == "GZ_TO_ROS" ? first.ros_topic : "*";
+      group.direction = first.direction;
+      group.members   = output.second;
+      for (size_t i : output.second) {
+        entries_[i].shared = true;
+      }
+      groups_.push_back(group);
+    }
+
+    // Best effort volatile subscriptions match any bridge QoS
+    for (const auto &topic : by_ros_topic) {
+      std::vector<size_t> indices = topic.second;
+      subscriptions_.push_back(this->create_generic_subscription(
+          topic.first, ros_types[indices.front()], rclcpp::QoS(10).best_effort(),
+          [this, indices](std::shared_ptr<rclcpp::SerializedMessage> msg) {
+            rosCallback(indices, *msg);
+          }));
+    }
+
+    // A node subscribes once per Gazebo topic, shared by the bridges reading it
+    for (const auto &topic : by_ign_topic) {
+      std::vector<size_t> indices = topic.second;
+      std::function<void(const google::protobuf::Message &,
+                         const ignition::transport::MessageInfo &)>
+          callback = [this, indices](const google::protobuf::Message &msg,
+                                     const ignition::transport::MessageInfo &) {
+            ignitionCallback(indices, msg);
+          };
+      if (!ign_node_->Subscribe(topic.first, callback)) {
+        RCLCPP_WARN(this->get_logger(), "Cannot subscribe to %s", topic.first.c_str());
+      }
+    }
+
+    if (!output_file_.empty() && isCsv()) {
+      std::ifstream existing(output_file_);
+      bool empty = !existing.good() || existing.peek() == std::ifstream::traits_type::eof();
+      csv_.open(output_file_, std::ios::app);
+      if (empty) {
+        csv_ << "time,drone,ign_topic,ros_topic,direction,ign_rate,ros_rate,ign_bandwidth,"
+                "ros_bandwidth,ign_latency_mean,ign_latency_max,ros_latency_mean,"
+                "ros_latency_max,drops\n";
+      }
+    }
+
+    start_time_   = Clock::now();
+    last_report_  = start_time_;
+    report_timer_ = this->create_wall_timer(std::chrono::duration<double>(period_),
+                                            std::bind(&BridgeDiagnostics::report, this));
+  }
+
+  ~BridgeDiagnostics() {
+    // No ignition callbacks past this point, then the last partial period is reported
+    // so short runs still leave their totals
+    ign_node_.stop();
+    if (!entries_.empty()) {
+      report();
+    }
+  }
+
+private:
+  using Clock     = std::chrono::steady_clock;
+  using TimePoint = Clock::time_point;
+
+  struct Side {
+    uint64_t count     = 0;
+    uint64_t bytes     = 0;
+    uint64_t stamped   = 0;
+    double latency_sum = 0.0;
+    double latency_max = 0.0;
+
+    void add(size_t size, double latency) {
+      count++;
+      bytes += size;
+      if (latency >= 0.0) {
+        stamped++;
+        latency_sum += latency;
+        latency_max = std::max(latency_max, latency);
+      }
+    }
+
+    void merge(const Side &other) {
+      count += other.count;
+      bytes += other.bytes;
+      stamped += other.stamped;
+      latency_sum += other.latency_sum;
+      latency_max = std::max(latency_max, other.latency_max);
+    }
+
+    double latencyMean() const { return stamped ? latency_sum / stamped : 0.0; }
+  };
+
+  struct Stats {
+    Side ign, ros;
+
+    uint64_t drops(const std::string &direction) const {
+      // Input side messages not seen on the output side, unknown for bidirectional bridges
+      if (direction == "GZ_TO_ROS") {
+        return ign.count > ros.count ? ign.count - ros.count : 0;
+      }
+      if (direction == "ROS_TO_GZ") {
+        return ros.count > ign.count ? ros.count - ign.count : 0;
+      }
+      return 0;
+    }
+
+    void merge(const Stats &other) {
+      ign.merge(other.ign);
+      ros.merge(other.ros);
+    }
+  };
+
+  struct Entry {
+    std::string drone, ign_topic, ros_topic, direction;
+    bool stamped = false;
+    // Output topic shared with other bridges, drops are only known for the group
+    bool shared = false;
+    // Bridges of a shared output group
+    std::vector<size_t> members;
+    Stats window, total;
+    uint64_t drops = 0;
+
+    uint64_t windowDrops() const { return shared ? 0 : window.drops(direction); }
+
+    Stats ownWindow() const {
+      // Without the shared output side, counted once by the group
+      Stats stats = window;
+      if (shared && direction == "GZ_TO_ROS") {
+        stats.ros = Side();
+      } else if (shared) {
+        stats.ign = Side();
+      }
+      return stats;
+    }
+  };
+
+  std::string world_name_;
+  double period_;
+  double max_latency_;
+  std::string output_file_;
+  std::ofstream csv_;
+  rclcpp::Publisher<diagnostic_msgs::msg::DiagnosticArray>::SharedPtr diagnostics_pub_;
+  rclcpp::TimerBase::SharedPtr report_timer_;
+  TimePoint start_time_, last_report_;
+
+  std::mutex mutex_;
+  std::vector<Entry> entries_;
+  std::vector<Entry> groups_;
+  std::vector<rclcpp::GenericSubscription::SharedPtr> subscriptions_;
+  // Recent clock ticks, simulation time and the wall time they were received
+  std::deque<std::pair<double, TimePoint>> ticks_;
+  static constexpr size_t max_ticks_ = 10000;
+
+  // Last member, destroyed first (see IgnitionNode)
+  IgnitionNode ign_node_;
+
+private:
+  static std::string csvField(const std::string &value) {
+    // Quoted, with quotes doubled, if it holds separators, quotes or line breaks
+    if (value.find_first_of(",\"\r\n") == std::string::npos) {
+      return value;
+    }
+    std::string out = "\"";
+    for (char c : value) {
+      out += c == '"' ? "\"\"" : std::string(1, c);
+    }
+    return out + "\"";
+  }
+
+  static std::string jsonString(const std::string &value) {
+    std::ostringstream out;
+    out << '"';
+    for (unsigned char c : value) {
+      if (c == '"' || c == '\\') {
+        out << '\\' << c;
+      } else if (c < 0x20) {
+        char escaped[7];
+        std::snprintf(escaped, sizeof(escaped), "\\u%04x", c);
+        out << escaped;
+      } else {
+        out << c;
+      }
+    }
+    out << '"';
+    return out.str();
+  }
+
+  bool isCsv() const {
+    return output_file_.size() >= 4 &&
+           output_file_.compare(output_file_.size() - 4, 4, ".csv") == 0;
+  }
+
+  void ignitionClockCallback(const ignition::msgs::Clock &ign_msg,
+                             const ignition::transport::MessageInfo &msg_info) {
+    double time = ign_msg.sim().sec() + ign_msg.sim().nsec() * 1e-9;
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (!ticks_.empty() && time < ticks_.back().first) {
+      // Simulation reset
+      ticks_.clear();
+    }
+    ticks_.emplace_back(time, Clock::now());
+    if (ticks_.size() > max_ticks_) {
+      ticks_.pop_front();
+    }
+  }
+
+  double latency(double stamp, const TimePoint &now) {
+    // Wall time since the first tick at or after stamp, negative if unknown
+    if (stamp < 0.0 || ticks_.empty() || stamp < ticks_.front().first) {
+      return -1.0;
+    }
+    auto it = std::lower_bound(
+        ticks_.begin(), ticks_.end(), stamp,
+        [](const std::pair<double, TimePoint> &tick, double t) { return tick.first < t; });
+    if (it == ticks_.end()) {
+      // Stamped ahead of the last clock message received
+      return 0.0;
+    }
+    return std::chrono::duration<double>(now - it->second).count();
+  }
+
+  static double ignitionStamp(const google::protobuf::Message &msg) {
+    // header.stamp of any message with a header, negative without one
+    using google::protobuf::FieldDescriptor;
+    const auto *header_field = msg.GetDescriptor()->FindFieldByName("header");
+    if (!header_field || header_field->cpp_type() != FieldDescriptor::CPPTYPE_MESSAGE ||
+        header_field->is_repeated() || !msg.GetReflection()->HasField(msg, header_field)) {
+      return -1.0;
+    }
+    const auto &header      = msg.GetReflection()->GetMessage(msg, header_field);
+    const auto *stamp_field = header.GetDescriptor()->FindFieldByName("stamp");
+    if (!stamp_field || stamp_field->cpp_type() != FieldDescriptor::CPPTYPE_MESSAGE) {
+      return -1.0;
+    }
+    const auto &stamp      = header.GetReflection()->GetMessage(header, stamp_field);
+    const auto *sec_field  = stamp.GetDescriptor()->FindFieldByName("sec");
+    const auto *nsec_field = stamp.GetDescriptor()->FindFieldByName("nsec");
+    if (!sec_field || !nsec_field) {
+      return -1.0;
+    }
+    return stamp.GetReflection()->GetInt64(stamp, sec_field) +
+           stamp.GetReflection()->GetInt32(stamp, nsec_field) * 1e-9;
+  }
+
+  static double rosStamp(const rclcpp::SerializedMessage &msg) {
+    // Messages starting with a header or a time: CDR encapsulation, then sec and nanosec
+    const auto &rcl_msg = msg.get_rcl_serialized_message();
+    if (rcl_msg.buffer_length < 12) {
+      return -1.0;
+    }
+    int32_t sec;
+    uint32_t nanosec;
+    std::memcpy(&sec, rcl_msg.buffer + 4, sizeof(sec));
+    std::memcpy(&nanosec, rcl_msg.buffer + 8, sizeof(nanosec));
+    bool little_endian_cdr  = rcl_msg.buffer[1] & 1;
+    bool little_endian_host = __BYTE_ORDER__ == __ORDER_LITTLE_ENDIAN__;
+    if (little_endian_cdr != little_endian_host) {
+      sec     = static_cast<int32_t>(__builtin_bswap32(static_cast<uint32_t>(sec)));
+      nanosec = __builtin_bswap32(nanosec);
+    }
+    return sec + nanosec * 1e-9;
+  }
+
+  void ignitionCallback(const std::vector<size_t> &indices, const google::protobuf::Message &msg) {
+    TimePoint now = Clock::now();
+    size_t size   = msg.ByteSizeLong();
+    double stamp  = ignitionStamp(msg);
+
+    std::lock_guard<std::mutex> lock(mutex_);
+    double delay = latency(stamp, now);
+    for (size_t i : indices) {
+      entries_[i].window.ign.add(size, delay);
+    }
+  }
+
+  void rosCallback(const std::vector<size_t> &indices, const rclcpp::SerializedMessage &msg) {
+    TimePoint now = Clock::now();
+    double stamp  = entries_[indices.front()].stamped ? rosStamp(msg) : -1.0;
+
+    std::lock_guard<std::mutex> lock(mutex_);
+    double delay = latency(stamp, now);
+    for (size_t i : indices) {
+      entries_[i].window.ros.add(msg.size(), delay);
+    }
+  }
+
+  static diagnostic_msgs::msg::KeyValue keyValue(const std::string &key, double value) {
+    diagnostic_msgs::msg::KeyValue kv;
+    kv.key = key;
+    std::ostringstream out;
+    out << value;
+    kv.value = out.str();
+    return kv;
+  }
+
+  diagnostic_msgs::msg::DiagnosticStatus status(const std::string &name,
+                                                const std::string &hardware_id,
+                                                const Stats &stats, uint64_t drops,
+                                                double elapsed) const {
+    diagnostic_msgs::msg::DiagnosticStatus status;
+    status.name        = name;
+    status.hardware_id = hardware_id;
+    status.values      = {
+        keyValue("ign_rate", stats.ign.count / elapsed),
+        keyValue("ros_rate", stats.ros.count / elapsed),
+        keyValue("ign_bandwidth", stats.ign.bytes / elapsed),
+        keyValue("ros_bandwidth", stats.ros.bytes / elapsed),
+        keyValue("ign_latency_mean", stats.ign.latencyMean()),
+        keyValue("ign_latency_max", stats.ign.latency_max),
+        keyValue("ros_latency_mean", stats.ros.latencyMean()),
+        keyValue("ros_latency_max", stats.ros.latency_max),
+        keyValue("drops", drops),
+    };
+
+    double latency_max = std::max(stats.ign.latency_max, stats.ros.latency_max);
+    if (drops > 0) {
+      status.level   = diagnostic_msgs::msg::DiagnosticStatus::WARN;
+      status.message = "dropping messages";
+    } else if (latency_max > max_latency_) {
+      status.level   = diagnostic_msgs::msg::DiagnosticStatus::WARN;
+      status.message = "lagging behind simulation";
+    } else if (stats.ign.count == 0 && stats.ros.count == 0) {
+      // Lazy bridges and unused inputs are idle, not faulty
+      status.level   = diagnostic_msgs::msg::DiagnosticStatus::OK;
+      status.message = "idle";
+    } else {
+      status.level   = diagnostic_msgs::msg::DiagnosticStatus::OK;
+      status.message = "ok";
+    }
+    return status;
+  }
+
+  void report() {
+    TimePoint now  = Clock::now();
+    double elapsed = std::chrono::duration<double>(now - last_report_).count();
+    double time    = std::chrono::duration<double>(now - start_time_).count();
+    if (elapsed <= 0.0) {
+      return;
+    }
+    last_report_ = now;
+
+    std::vector<Entry> entries, groups;
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      for (auto &group : groups_) {
+        // Inputs of every member, the shared output once
+        group.window = Stats();
+        for (size_t i : group.members) {
+          group.window.merge(entries_[i].ownWindow());
+        }
+        if (group.direction == "GZ_TO_ROS") {
+          group.window.ros = entries_[group.members.front()].window.ros;
+        } else {
+          group.window.ign = entries_[group.members.front()].window.ign;
+        }
+        group.drops += group.windowDrops();
+        group.total.merge(group.window);
+      }
+      for (auto &entry : entries_) {
+        entry.drops += entry.windowDrops();
+        entry.total.merge(entry.window);
+      }
+      entries = entries_;
+      groups  = groups_;
+      for (auto &entry : entries_) {
+        entry.window = Stats();
+      }
+    }
+
+    diagnostic_msgs::msg::DiagnosticArray msg;
+    msg.header.stamp = this->now();
+    std::map<std::string, std::pair<Stats, uint64_t>> drones;
+    for (const auto &entry : entries) {
+      uint64_t drops = entry.windowDrops();
+      msg.status.push_back(status("bridges: " + entry.drone + ": " + entry.ros_topic,
+                                  entry.drone, entry.window, drops, elapsed));
+      drones[entry.drone].first.merge(entry.ownWindow());
+      drones[entry.drone].second += drops;
+    }
+    for (const auto &drone : drones) {
+      msg.status.push_back(status("bridges: " + drone.first, drone.first, drone.second.first,
+                                  drone.second.second, elapsed));
+    }
+    for (const auto &group : groups) {
+      std::string topic = group.direction == "GZ_TO_ROS" ? group.ros_topic : group.ign_topic;
+      msg.status.push_back(status("bridges: shared: " + topic, "", group.window,
+                                  group.windowDrops(), elapsed));
+    }
+    entries.insert(entries.end(), groups.begin(), groups.end());
+    if (rclcpp::ok()) {
+      diagnostics_pub_->publish(msg);
+    }
+
+    if (output_file_.empty()) {
+      return;
+    }
+    if (isCsv()) {
+      writeCsv(entries, time, elapsed);
+    } else {
+      writeJson(entries, time);
+    }
+  }
+
+  void writeCsv(const std::vector<Entry> &entries, double time, double elapsed) {
+    for (const auto &entry : entries) {
+      const Stats &s = entry.window;
+      csv_ << time << ',' << csvField(entry.drone) << ',' << csvField(entry.ign_topic) << ','
+           << csvField(entry.ros_topic) << ',' << entry.direction << ','
+           << s.ign.count / elapsed << ',' << s.ros.count / elapsed << ','
+           << s.ign.bytes / elapsed << ',' << s.ros.bytes / elapsed << ','
+           << s.ign.latencyMean() << ',' << s.ign.latency_max << ',' << s.ros.latencyMean()
+           << ',' << s.ros.latency_max << ',' << entry.windowDrops() << '\n';
+    }
+    csv_.flush();
+  }
+
+  void writeJson(const std::vector<Entry> &entries, double time) {
+    // Run totals, rewritten every period so the file is always complete
+    auto side = [time](const Side &s) {
+      std::ostringstream out;
+      out << "{\"messages\": " << s.count << ", \"bytes\": " << s.bytes
+          << ", \"rate\": " << s.count / time << ", \"bandwidth\": " << s.bytes / time
+          << ", \"latency_mean\": " << s.latencyMean() << ", \"latency_max\": " << s.latency_max
+          << "}";
+      return out.str();
+    };
+
+    std::ostringstream out;
+    out << "{\"world\": " << jsonString(world_name_) << ", \"duration\": " << time
+        << ", \"bridges\": [";
+    for (size_t i = 0; i < entries.size(); i++) {
+      const Entry &entry = entries[i];
+      out << (i ? ",\n  " : "\n  ") << "{\"drone\": " << jsonString(entry.drone)
+          << ", \"ign_topic\": " << jsonString(entry.ign_topic)
+          << ", \"ros_topic\": " << jsonString(entry.ros_topic)
+          << ", \"direction\": " << jsonString(entry.direction) << ", \"ign\": "
+          << side(entry.total.ign) << ", \"ros\": " << side(entry.total.ros)
+          << ", \"drops\": " << entry.drops << "}";
+    }
+    out << "\n]}\n";
+
+    // Written to a temporary file first so readers never see partial files
+    std::string tmp_file = output_file_ + ".tmp";
+    {
+      std::ofstream file(tmp_file);
+      file << out.str();
+    }
+    std::rename(tmp_file.c_str(), output_file_.c_str());
+  }
+};
+
+}  // namespace ignition_assets
+
+RCLCPP_COMPONENTS_REGISTER_NODE(ignition_assets::BridgeDiagnostics)
@@ -7,11 +7,17 @@
 #include <ignition/transport.hh>
 #include <ros_gz_bridge/convert.hpp>
 #include "rclcpp/rclcpp.hpp"
+#include "rclcpp_components/register_node_macro.hpp"
 #include "sensor_msgs/msg/nav_sat_fix.hpp"
 
+#include "ignition_node.hpp"
+
+namespace ignition_assets {
+
 class GPSBridge : public rclcpp::Node {
 public:
-  GPSBridge() : Node("gps_bridge") {
+  explicit GPSBridge(const rclcpp::NodeOptions &options = rclcpp::NodeOptions())
+      : Node("gps_bridge", options) {
     this->declare_parameter<std::string>("world_name");
     this->get_parameter("world_name", world_name);
 
@@ -27,20 +33,22 @@ public:
     this->declare_parameter<std::string>("sensor_type");
     this->get_parameter("sensor_type", sensor_type);
 
+    gps_pub_ = this->create_publisher<sensor_msgs::msg::NavSatFix>(
+        as2_names::topics::sensor_measurements::gps, as2_names::topics::sensor_measurements::qos);
+
     // Initialize the ignition node
-    ign_node_ptr_         = std::make_shared<ignition::transport::Node>();
     std::string gps_topic = "/world/" + world_name + "/model/" + name_space + "/model/" +
                             sensor_name + "/link/" + link_name + "/sensor/" + sensor_type +
                             "/navsat";
-    ign_node_ptr_->Subscribe(gps_topic, this->ignitionGPSCallback);
-    gps_pub_ = this->create_publisher<sensor_msgs::msg::NavSatFix>(
-        as2_names::topics::sensor_measurements::gps, as2_names::topics::sensor_measurements::qos);
+    ign_node_->Subscribe(gps_topic, &GPSBridge::ignitionGPSCallback, this);
   }
 
 private:
-  std::shared_ptr<ignition::transport::Node> ign_node_ptr_;
   std::string world_name, name_space, sensor_name, link_name, sensor_type;
-  static rclcpp::Publisher<sensor_msgs::msg::NavSatFix>::SharedPtr gps_pub_;
+  rclcpp::Publisher<sensor_msgs::msg::NavSatFix>::SharedPtr gps_pub_;
+
+  // Last member, destroyed first (see IgnitionNode)
+  IgnitionNode ign_node_;
 
 private:
   static std::string replace_delimiter(const std::string &input,
@@ -63,8 +71,8 @@ private:
     return output;
   }
 
-  static void ignitionGPSCallback(const ignition::msgs::NavSat &ign_msg,
-                                  const ignition::transport::MessageInfo &msg_info) {
+  void ignitionGPSCallback(const ignition::msgs::NavSat &ign_msg,
+                           const ignition::transport::MessageInfo &msg_info) {
     sensor_msgs::msg::NavSatFix ros_msg;
 
     ros_gz_bridge::convert_gz_to_ros(ign_msg.header(), ros_msg.header);
@@ -81,11 +89,6 @@ private:
   };
 };
 
-rclcpp::Publisher<sensor_msgs::msg::NavSatFix>::SharedPtr GPSBridge::gps_pub_ = nullptr;
+}  // namespace ignition_assets
 
-int main(int argc, char *argv[]) {
-  rclcpp::init(argc, argv);
-  rclcpp::spin(std::make_shared<GPSBridge>());
-  rclcpp::shutdown();
-  return 0;
-}
+RCLCPP_COMPONENTS_REGISTER_NODE(ignition_assets::GPSBridge)
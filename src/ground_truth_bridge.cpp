@@ -4,6 +4,7 @@
 
 #include "rclcpp/publisher.hpp"
 #include "rclcpp/rclcpp.hpp"
+#include "rclcpp_components/register_node_macro.hpp"
 
 #include <as2_core/names/topics.hpp>
 #include "geometry_msgs/msg/pose_stamped.hpp"
@@ -13,9 +14,14 @@
 #include <ignition/transport.hh>
 #include <ros_gz_bridge/convert.hpp>
 
+#include "ignition_node.hpp"
+
+namespace ignition_assets {
+
 class GroundTruthBridge : public rclcpp::Node {
 public:
-  GroundTruthBridge() : Node("ground_truth_bridge") {
+  explicit GroundTruthBridge(const rclcpp::NodeOptions &options = rclcpp::NodeOptions())
+      : Node("ground_truth_bridge", options) {
     this->declare_parameter<std::string>("name_space");
     this->get_parameter("name_space", model_name_);
 
@@ -25,48 +31,30 @@ public:
     this->declare_parameter<std::string>("twist_frame_id");
     this->get_parameter("twist_frame_id", twist_frame_id_);
 
-    // Initialize the ignition node
-    ign_node_ptr_                  = std::make_shared<ignition::transport::Node>();
-    std::string ground_truth_topic = "/model/" + model_name_ + "/odometry";
-    ign_node_ptr_->Subscribe(ground_truth_topic, this->ignitionGroundTruthCallback);
-
     ps_pub_ = this->create_publisher<geometry_msgs::msg::PoseStamped>(
         as2_names::topics::ground_truth::pose, as2_names::topics::ground_truth::qos);
     ts_pub_ = this->create_publisher<geometry_msgs::msg::TwistStamped>(
         as2_names::topics::ground_truth::twist, as2_names::topics::ground_truth::qos);
+
+    // Initialize the ignition node
+    std::string ground_truth_topic = "/model/" + model_name_ + "/odometry";
+    ign_node_->Subscribe(ground_truth_topic, &GroundTruthBridge::ignitionGroundTruthCallback,
+                             this);
   }
 
 private:
-  std::shared_ptr<ignition::transport::Node> ign_node_ptr_;
   std::string model_name_;
-  static std::string pose_frame_id_;
-  static std::string twist_frame_id_;
-  static rclcpp::Publisher<geometry_msgs::msg::PoseStamped>::SharedPtr ps_pub_;
-  static rclcpp::Publisher<geometry_msgs::msg::TwistStamped>::SharedPtr ts_pub_;
+  std::string pose_frame_id_;
+  std::string twist_frame_id_;
+  rclcpp::Publisher<geometry_msgs::msg::PoseStamped>::SharedPtr ps_pub_;
+  rclcpp::Publisher<geometry_msgs::msg::TwistStamped>::SharedPtr ts_pub_;
 
-private:
-  static std::string replace_delimiter(const std::string &input,
-                                       const std::string &old_delim,
-                                       const std::string new_delim) {
-    std::string output;
-    output.reserve(input.size());
-
-    std::size_t last_pos = 0;
-
-    while (last_pos < input.size()) {
-      std::size_t pos = input.find(old_delim, last_pos);
-      output += input.substr(last_pos, pos - last_pos);
-      if (pos != std::string::npos) {
-        output += new_delim;
-        pos += old_delim.size();
-      }
-      last_pos = pos;
-    }
-    return output;
-  }
+  // Last member, destroyed first (see IgnitionNode)
+  IgnitionNode ign_node_;
 
-  static void ignitionGroundTruthCallback(const ignition::msgs::Odometry &ign_msg,
-                                          const ignition::transport::MessageInfo &msg_info) {
+private:
+  void ignitionGroundTruthCallback(const ignition::msgs::Odometry &ign_msg,
+                                   const ignition::transport::MessageInfo &msg_info) {
     geometry_msgs::msg::PoseStamped ps_msg;
     geometry_msgs::msg::TwistStamped ts_msg;
 
@@ -93,14 +81,6 @@ private:
   };
 };
 
-rclcpp::Publisher<geometry_msgs::msg::PoseStamped>::SharedPtr GroundTruthBridge::ps_pub_  = nullptr;
-rclcpp::Publisher<geometry_msgs::msg::TwistStamped>::SharedPtr GroundTruthBridge::ts_pub_ = nullptr;
-std::string GroundTruthBridge::pose_frame_id_                                             = "";
-std::string GroundTruthBridge::twist_frame_id_                                            = "";
-
-int main(int argc, char *argv[]) {
-  rclcpp::init(argc, argv);
-  rclcpp::spin(std::make_shared<GroundTruthBridge>());
-  rclcpp::shutdown();
-  return 0;
-}
+}  // namespace ignition_assets
+
+RCLCPP_COMPONENTS_REGISTER_NODE(ignition_assets::GroundTruthBridge)
@@ -1,5 +1,14 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
+import functools
+import hashlib
+import os
+import tempfile
+
+import yaml
+
+# libyaml backed dumper when available, several times faster than the pure Python one
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
 
 
 class BridgeDirection(Enum):
@@ -15,13 +24,38 @@ DIRECTION_SYMS = {
 }
 
 
-@dataclass
+# ROS QoS policy values, first one is the default
+RELIABILITY = ['reliable', 'best_effort']
+DURABILITY = ['volatile', 'transient_local']
+
+# ros_gz_bridge config file direction names
+CONFIG_DIRECTIONS = {
+    BridgeDirection.BIDIRECTIONAL: 'BIDIRECTIONAL',
+    BridgeDirection.IGN_TO_ROS: 'GZ_TO_ROS',
+    BridgeDirection.ROS_TO_IGN: 'ROS_TO_GZ',
+}
+
+
+@dataclass(frozen=True)
 class Bridge:
     ign_topic: str
     ros_topic: str
     ign_type: str
     ros_type: str
     direction: BridgeDirection
+    # QoS: queues are the history depth of each side, reliability and durability
+    # apply to the ROS endpoint. Lazy bridges only run while the output is subscribed.
+    subscriber_queue: int = 10
+    publisher_queue: int = 10
+    reliability: str = RELIABILITY[0]
+    durability: str = DURABILITY[0]
+    lazy: bool = False
+
+    def __post_init__(self):
+        if self.reliability not in RELIABILITY:
+            raise RuntimeError(f'Bridge {self.ign_topic}: reliability must be one of {RELIABILITY}')
+        if self.durability not in DURABILITY:
+            raise RuntimeError(f'Bridge {self.ign_topic}: durability must be one of {DURABILITY}')
 
     def argument(self):
         out = f'{self.ign_topic}@{self.ros_type}{DIRECTION_SYMS[self.direction]}{self.ign_type}'
@@ -29,3 +63,117 @@ class Bridge:
 
     def remapping(self):
         return (self.ign_topic, self.ros_topic)
+
+    def config(self):
+        # ros_gz_bridge config file entry
+        return {
+            'ros_topic_name': self.ros_topic,
+            'gz_topic_name': self.ign_topic,
+            'ros_type_name': self.ros_type,
+            'gz_type_name': self.ign_type,
+            'direction': CONFIG_DIRECTIONS[self.direction],
+            'subscriber_queue': self.subscriber_queue,
+            'publisher_queue': self.publisher_queue,
+            'lazy': self.lazy,
+        }
+
+    def qos_overrides(self, namespace=''):
+        # ROS QoS override parameters for the non default policies of the ROS endpoint,
+        # the bridge config file only sets history depth
+        policies = {}
+        if self.reliability != RELIABILITY[0]:
+            policies['reliability'] = self.reliability
+        if self.durability != DURABILITY[0]:
+            policies['durability'] = self.durability
+        if not policies:
+            return {}
+
+        topic = self.ros_topic
+        if not topic.startswith('/'):
+            namespace = namespace.strip('/')
+            topic = f'/{namespace}/{topic}' if namespace else f'/{topic}'
+
+        entities = []
+        if self.direction != BridgeDirection.ROS_TO_IGN:
+            entities.append('publisher')
+        if self.direction != BridgeDirection.IGN_TO_ROS:
+            entities.append('subscription')
+        return {f'qos_overrides.{topic}.{entity}.{policy}': value
+                for entity in entities for policy, value in policies.items()}
+
+    def route(self):
+        # Topics, types and direction, bridges with the same route are duplicates
+        return (self.ign_topic, self.ros_topic, self.ign_type, self.ros_type, self.direction)
+
+    def namespaced(self, namespace):
+        # Resolve relative ROS topic against namespace, to run outside a namespaced node
+        if self.ros_topic.startswith('/'):
+            return self
+        return replace(self, ros_topic=f'/{namespace}/{self.ros_topic}')
+
+
+def consolidate(bridges):
+    # Remove duplicated bridges keeping order and the first settings of each route,
+    # all ROS topics must be absolute
+    unique = {}
+    remaps = {}
+    for bridge in bridges:
+        if bridge.route() in unique:
+            continue
+        if remaps.get(bridge.ign_topic, bridge.ros_topic) != bridge.ros_topic:
+            raise RuntimeError(f'Bridge {bridge.ign_topic} remapped to both '
+                               f'{remaps[bridge.ign_topic]} and {bridge.ros_topic}')
+        remaps[bridge.ign_topic] = bridge.ros_topic
+        unique[bridge.route()] = bridge
+    return list(unique.values())
+
+
+def split(bridges, n):
+    # Split bridges into at most n contiguous shards of similar size
+    if not bridges:
+        return []
+    n = max(1, min(n, len(bridges)))
+    size, extra = divmod(len(bridges), n)
+    shards = []
+    start = 0
+    for i in range(n):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(bridges[start:end])
+        start = end
+    return shards
+
+
+def config_dir():
+    return os.path.join(tempfile.gettempdir(), 'ign_assets_bridges')
+
+
+@functools.lru_cache(maxsize=256)
+def _dump(bridges):
+    # Bridges are frozen, identical bridge sets (e.g. relaunched drones) are dumped once
+    return yaml.dump([bridge.config() for bridge in bridges], Dumper=YAML_DUMPER,
+                     sort_keys=False)
+
+
+def write_config(bridges, filename=None):
+    """
+    Write bridges as a ros_gz_bridge YAML config file, returns its path.
+
+    Without filename, the file is named after its contents, so each
+    bridge set is written once and shared by later launches.
+    """
+    content = _dump(tuple(bridges))
+    if filename is None:
+        digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+        filename = os.path.join(config_dir(), f'{digest}.yaml')
+        if os.path.exists(filename):
+            return filename
+
+    dirname = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(dirname, exist_ok=True)
+    # Write to a temporary file first so concurrent launches never read partial files
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, filename)
+    return filename
@@ -101,24 +101,32 @@ def battery(model_name):
         direction=BridgeDirection.IGN_TO_ROS)
 
 
-def image(world_name, model_name, sensor_name, sensor_type, model_prefix=''):
+# Heavy sensor streams (images, point clouds) are lazy and best effort by default,
+# so they are only converted while subscribed and never block on slow subscribers.
+def image(world_name, model_name, sensor_name, sensor_type, model_prefix='',
+          lazy=True, reliability='best_effort'):
     sensor_prefix = prefix(world_name, model_name, sensor_name, sensor_type)
     return Bridge(
         ign_topic=f'{sensor_prefix}/camera/image',
         ros_topic=f'sensor_measurements/{model_prefix}/image_raw',
         ign_type='ignition.msgs.Image',
         ros_type='sensor_msgs/msg/Image',
-        direction=BridgeDirection.IGN_TO_ROS)
+        direction=BridgeDirection.IGN_TO_ROS,
+        reliability=reliability,
+        lazy=lazy)
 
 
-def depth_image(world_name, model_name, sensor_name, sensor_type, model_prefix=''):
+def depth_image(world_name, model_name, sensor_name, sensor_type, model_prefix='',
+                lazy=True, reliability='best_effort'):
     sensor_prefix = prefix(world_name, model_name, sensor_name, sensor_type)
     return Bridge(
         ign_topic=f'{sensor_prefix}/camera/depth_image',
         ros_topic=f'sensor_measurements/{model_prefix}/depth',
         ign_type='ignition.msgs.Image',
         ros_type='sensor_msgs/msg/Image',
-        direction=BridgeDirection.IGN_TO_ROS)
+        direction=BridgeDirection.IGN_TO_ROS,
+        reliability=reliability,
+        lazy=lazy)
 
 
 def camera_info(world_name, model_name, sensor_name, sensor_type, model_prefix=''):
@@ -141,24 +149,30 @@ def lidar_scan(world_name, model_name, sensor_name, sensor_type, model_prefix=''
         direction=BridgeDirection.IGN_TO_ROS)
 
 
-def lidar_points(world_name, model_name, sensor_name, sensor_type, model_prefix=''):
+def lidar_points(world_name, model_name, sensor_name, sensor_type, model_prefix='',
+                 lazy=True, reliability='best_effort'):
     sensor_prefix = prefix(world_name, model_name, sensor_name, sensor_type)
     return Bridge(
         ign_topic=f'{sensor_prefix}/gpu_ray/scan/points',
         ros_topic=f'sensor_measurements/{model_prefix}/points',
         ign_type='ignition.msgs.PointCloudPacked',
         ros_type='sensor_msgs/msg/PointCloud2',
-        direction=BridgeDirection.IGN_TO_ROS)
+        direction=BridgeDirection.IGN_TO_ROS,
+        reliability=reliability,
+        lazy=lazy)
 
 
-def camera_points(world_name, model_name, sensor_name, sensor_type, model_prefix=''):
+def camera_points(world_name, model_name, sensor_name, sensor_type, model_prefix='',
+                  lazy=True, reliability='best_effort'):
     sensor_prefix = prefix(world_name, model_name, sensor_name, sensor_type)
     return Bridge(
         ign_topic=f'{sensor_prefix}/camera/points',
         ros_topic=f'sensor_measurements/{model_prefix}/points',
         ign_type='ignition.msgs.PointCloudPacked',
         ros_type='sensor_msgs/msg/PointCloud2',
-        direction=BridgeDirection.IGN_TO_ROS)
+        direction=BridgeDirection.IGN_TO_ROS,
+        reliability=reliability,
+        lazy=lazy)
 
 
 # NOT USED; BRIDGE NOT SUPPORTED IN FORTRESS
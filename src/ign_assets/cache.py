@@ -0,0 +1,242 @@
+import functools
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import ign_assets.flatten
+import ign_assets.render
+
+
+MODEL_URI = re.compile(r'model://([\w\-]+)')
+MESH_URI = re.compile(r'<uri>\s*([^<\s]+\.(?:dae|stl|obj))\s*</uri>', re.IGNORECASE)
+
+
+def default_cache_dir():
+    if 'IGN_ASSETS_CACHE_DIR' in os.environ:
+        return os.environ['IGN_ASSETS_CACHE_DIR']
+    cache_home = os.getenv('XDG_CACHE_HOME', default=os.path.expanduser('~/.cache'))
+    return os.path.join(cache_home, 'ignition_assets', 'sdf')
+
+
+@functools.lru_cache(maxsize=1024)
+def _file_digest(filepath, mtime_ns, size):
+    # Memoized on (path, mtime, size), so unchanged files are hashed only once per process
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def file_digest(filepath):
+    st = os.stat(filepath)
+    return _file_digest(filepath, st.st_mtime_ns, st.st_size)
+
+
+def model_files(models_dir, model_name):
+    # Files of an included model that end up in the loaded SDF
+    model_path = os.path.join(models_dir, model_name)
+    if not os.path.isdir(model_path):
+        return []
+    return sorted(os.path.join(model_path, f) for f in os.listdir(model_path)
+                  if f == 'model.config' or f.endswith('.sdf'))
+
+
+@functools.lru_cache(maxsize=64)
+def _template_includes(template, digest):
+    with open(template, 'r') as f:
+        return frozenset(MODEL_URI.findall(f.read()))
+
+
+def template_files(template, sensors):
+    # Template plus every model:// file it may include, static or from the payload
+    models_dir = os.path.dirname(os.path.dirname(os.path.abspath(template)))
+    includes = set(_template_includes(template, file_digest(template)))
+    includes.update(sensor['model'] for sensor in sensors)
+
+    files = [template]
+    for model_name in sorted(includes):
+        files.extend(model_files(models_dir, model_name))
+    return files
+
+
+@functools.lru_cache(maxsize=256)
+def _mesh_uris(filepath, digest):
+    with open(filepath, 'r') as f:
+        return tuple(MESH_URI.findall(f.read()))
+
+
+def mesh_files(files, models_dir):
+    # Mesh files referenced by SDF files, the sources of flattened and LOD meshes
+    meshes = set()
+    for filepath in files:
+        if os.path.basename(filepath) == 'model.config':
+            continue
+        for uri in _mesh_uris(filepath, file_digest(filepath)):
+            try:
+                uri = ign_assets.flatten.resolve_uri(uri, models_dir, os.path.dirname(filepath))
+            except RuntimeError:
+                continue
+            if uri.startswith('file://') and os.path.isfile(uri[len('file://'):]):
+                meshes.add(uri[len('file://'):])
+    return sorted(meshes)
+
+
+class SdfCache:
+    """
+    Content-addressed cache of rendered SDF files.
+
+    Entries are keyed on the template sources and render parameters, and
+    evicted in least recently used order once max_entries is exceeded, at
+    startup and after each batch (see evict). Entries used by this process
+    are never evicted by it, so the limit grows with the swarm.
+    Drones only differing by namespace share one rendered body, their
+    instances are not entries: they are written to the caller's output file,
+    or next to the body and evicted with it.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=512):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        # Entries returned by this process, their paths must stay valid
+        self._used = set()
+        # Bodies rendered or read by this process, by key
+        self._bodies = {}
+        self.evict()
+
+    def _lock(self, key):
+        # Per entry lock, concurrent renders of one body wait for the first one
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def key(self, template, namespace, sensors, odom=True, battery=0.0, fidelity=None,
+            flatten=False, lod=None, odom_rate=None):
+        h = hashlib.sha256()
+        files = template_files(template, sensors)
+        if flatten or lod:
+            # Flattened SDFs point at the meshes, or at LOD variants named after their contents
+            models_dir = os.path.dirname(os.path.dirname(os.path.abspath(template)))
+            files += mesh_files(files, models_dir)
+        for filepath in files:
+            h.update(os.path.basename(filepath).encode())
+            h.update(file_digest(filepath).encode())
+        params = {'namespace': namespace, 'sensors': sensors, 'odom': odom,
+                  'battery': float(battery), 'fidelity': fidelity, 'flatten': flatten,
+                  'lod': lod, 'odom_rate': odom_rate}
+        if flatten or lod:
+            # Flattened SDFs hold absolute paths into the models directory
+            params['models_dir'] = os.path.dirname(os.path.dirname(os.path.abspath(template)))
+        h.update(json.dumps(params, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.sdf')
+
+    def instance_path(self, key, namespace):
+        # Instances of a body live in a directory of their own, outside of the LRU scan
+        return os.path.join(self.cache_dir, key, f'{namespace}.sdf')
+
+    def get(self, key):
+        # Return cached file path, or None on a cache miss
+        filepath = self.path(key)
+        try:
+            # Refresh modification time, used as LRU timestamp
+            os.utime(filepath)
+        except FileNotFoundError:
+            return None
+        self._used.add(filepath)
+        return filepath
+
+    def put(self, key, result):
+        filepath = self.path(key)
+        _write(result, filepath)
+        self._used.add(filepath)
+        return filepath
+
+    def render(self, template, env_dir, namespace, sensors=None, odom=True, battery=0.0,
+               fidelity=None, flatten=False, lod=None, odom_rate=None, output_file=None):
+        # Return the SDF path, rendering the template only on a cache miss.
+        # The template is rendered once per (template, payload, settings) signature
+        # with a namespace placeholder, drones sharing it only cost a substitution.
+        # The SDF is written to output_file if given, else next to the cached body
+        sensors = sensors or []
+        body_key = self.key(template, None, sensors, odom, battery, fidelity, flatten, lod,
+                            odom_rate)
+        with self._lock(body_key):
+            body_path = self.get(body_key)
+            body = self._bodies.get(body_key)
+            if body is None and body_path is not None:
+                try:
+                    with open(body_path, 'r') as f:
+                        body = f.read()
+                except FileNotFoundError:
+                    # Evicted by another process since get
+                    body_path = None
+            if body is None:
+                body = ign_assets.render.render(
+                    template, env_dir, ign_assets.render.NAMESPACE_PLACEHOLDER, sensors, odom,
+                    battery, fidelity, flatten, lod, odom_rate)
+            if body_path is None:
+                body_path = self.put(body_key, body)
+            self._bodies[body_key] = body
+
+        if output_file:
+            _write(ign_assets.render.instantiate(body, namespace), output_file)
+            return output_file
+        if ign_assets.render.NAMESPACE_PLACEHOLDER not in body:
+            # Namespace independent template, every drone spawns the same file
+            return body_path
+
+        filepath = self.instance_path(body_key, namespace)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        _write(ign_assets.render.instantiate(body, namespace), filepath)
+        return filepath
+
+    def evict(self):
+        # Scans the whole cache, so it is only run once per batch of renders, not per entry
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.sdf') and entry.path not in self._used:
+                    try:
+                        entries.append((entry.stat().st_mtime_ns, entry.path))
+                    except FileNotFoundError:
+                        continue
+        if len(entries) + len(self._used) <= self.max_entries:
+            return
+        entries.sort()
+        for _, filepath in entries[:len(entries) + len(self._used) - self.max_entries]:
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+            # Instances go with their body
+            shutil.rmtree(filepath[:-len('.sdf')], ignore_errors=True)
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            filepath = os.path.join(self.cache_dir, name)
+            if name.endswith('.sdf'):
+                os.remove(filepath)
+            elif os.path.isdir(filepath):
+                shutil.rmtree(filepath, ignore_errors=True)
+        self._bodies.clear()
+
+
+def _write(result, filepath):
+    # Write to a temporary file first so concurrent readers never see partial files
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filepath)),
+                                    suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(result)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, filepath)
+
+
+@functools.lru_cache(maxsize=None)
+def default_cache():
+    return SdfCache()
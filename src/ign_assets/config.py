@@ -0,0 +1,174 @@
+from dataclasses import dataclass, field
+import functools
+import json
+import os
+
+import yaml
+
+from ign_assets.model import Model
+
+
+@dataclass
+class ConfigDiff:
+    # Drone names added, removed and changed between two configs
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    # World or world wide settings (e.g. TF aggregation) changed
+    world_changed: bool = False
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.world_changed)
+
+    def __str__(self):
+        parts = [f'{kind}: {", ".join(names)}' for kind, names in
+                 [('added', self.added), ('removed', self.removed), ('changed', self.changed)]
+                 if names]
+        if self.world_changed:
+            parts.insert(0, 'world changed')
+        return '; '.join(parts) or 'no changes'
+
+
+class SimulationConfig:
+    """
+    Simulation launch config: world name, fidelity profile, mesh LOD, TF aggregation,
+    swarm ground truth streams and drone models.
+
+    Models are built on first access, a lookup by name only builds
+    the requested one.
+    """
+
+    def __init__(self, world, entries, fidelity=None, lod=None, tf_aggregation=False,
+                 swarm_ground_truth=None):
+        self.world = world
+        self.fidelity = fidelity
+        self.lod = lod
+        self.tf_aggregation = tf_aggregation
+        # Swarm ground truth rates by stream name, 0 publishes every tick
+        self.swarm_ground_truth = dict(swarm_ground_truth or {})
+        for stream, rate in self.swarm_ground_truth.items():
+            if not isinstance(rate, (int, float)) or rate < 0:
+                raise RuntimeError(f'Invalid swarm ground truth rate {rate} of {stream}')
+        self._entries = entries
+        self._index = {entry['name']: i for i, entry in enumerate(entries) if 'name' in entry}
+        self._models = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self.models)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, name):
+        return self._model(self._index[name])
+
+    def get(self, name):
+        if name not in self._index:
+            return None
+        return self[name]
+
+    @property
+    def names(self):
+        return list(self._index)
+
+    @property
+    def odom_rate(self):
+        # Odometry rate every stream is fed by, None (model rate) if some need every tick
+        rates = self.swarm_ground_truth.values()
+        if not rates or 0 in rates:
+            return None
+        return float(max(rates))
+
+    @property
+    def models(self):
+        return [self._model(i) for i in range(len(self._entries))]
+
+    def _model(self, i):
+        if i not in self._models:
+            model = Model._FromConfigDictJson(self._entries[i], i)
+            # Config fidelity applies to drones without their own
+            if self.fidelity and 'fidelity' not in self._entries[i]:
+                model.set_fidelity(self.fidelity)
+            if self.lod and 'lod' not in self._entries[i]:
+                model.set_lod(self.lod)
+            if self.odom_rate and 'odom_rate' not in self._entries[i]:
+                model.set_odom_rate(self.odom_rate)
+            model.tf_aggregation = self.tf_aggregation
+            self._models[i] = model
+        return self._models[i]
+
+    def entry(self, name):
+        # Drone config entry with the config wide settings it inherits
+        entry = dict(self._entries[self._index[name]])
+        if self.fidelity:
+            entry.setdefault('fidelity', self.fidelity)
+        if self.lod:
+            entry.setdefault('lod', self.lod)
+        if self.odom_rate:
+            entry.setdefault('odom_rate', self.odom_rate)
+        return entry
+
+    def diff(self, applied):
+        """
+        Changes from a previously applied config, drones keyed by name.
+
+        A drone changes when any of its settings does, inherited ones
+        included. Drones without a name cannot be told apart and are ignored.
+        """
+        return ConfigDiff(
+            added=[name for name in self._index if name not in applied],
+            removed=[name for name in applied._index if name not in self],
+            changed=[name for name in self._index
+                     if name in applied and self.entry(name) != applied.entry(name)],
+            world_changed=self.world != applied.world or
+            self.tf_aggregation != applied.tf_aggregation or
+            self.swarm_ground_truth != applied.swarm_ground_truth)
+
+    def set_fidelity(self, fidelity):
+        # Override the config fidelity profile, also on models already built
+        self.fidelity = fidelity
+        for i, model in self._models.items():
+            if 'fidelity' not in self._entries[i]:
+                model.set_fidelity(fidelity)
+
+    def set_lod(self, lod):
+        # Override the config mesh LOD, also on models already built
+        self.lod = lod
+        for i, model in self._models.items():
+            if 'lod' not in self._entries[i]:
+                model.set_lod(lod)
+
+    def copy(self):
+        # Same settings and drone entries (never modified), models are built anew
+        return type(self)(self.world, self._entries, self.fidelity, self.lod,
+                          self.tf_aggregation, self.swarm_ground_truth)
+
+    @classmethod
+    def load(cls, config_file):
+        # Parsed once per file version, every call gets its own instance, so overrides
+        # (set_fidelity, set_lod) never reach later loads of the same file
+        config_file = os.path.abspath(config_file)
+        return _load(cls, config_file, os.stat(config_file).st_mtime_ns).copy()
+
+    @classmethod
+    def FromStream(cls, stream):
+        file_extension = stream.name.split('.')[-1]
+        if file_extension in ['yaml', 'yml']:
+            config = yaml.safe_load(stream)
+        else:
+            config = json.load(stream)
+
+        if 'world' not in config:
+            raise RuntimeError('Cannot construct simulation without world in config')
+        return cls(config['world'], config.get('drones', []), config.get('fidelity'),
+                   config.get('lod'), bool(config.get('tf_aggregation', False)),
+                   config.get('swarm_ground_truth'))
+
+
+@functools.lru_cache(maxsize=8)
+def _load(cls, config_file, mtime_ns):
+    with open(config_file, 'r') as stream:
+        return cls.FromStream(stream)
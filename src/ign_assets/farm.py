@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+import json
+import os
+import signal
+import subprocess
+import tempfile
+import time
+
+from ign_assets.monitor import PARTITION_ENVS
+
+
+# Highest ROS 2 domain ID usable on every platform
+MAX_DOMAIN_ID = 101
+
+
+def instance_output_dir(instance):
+    # Rendered SDF directory of a named simulation instance
+    return os.path.join(tempfile.gettempdir(), 'ign_assets_instances', instance)
+
+
+@dataclass
+class Instance:
+    """
+    Headless simulation run of a farm.
+
+    Each instance gets its own Gazebo transport partition (its name),
+    ROS domain, output directory and cores, so instances never see
+    each other's topics, servers or files.
+    """
+
+    index: int
+    name: str
+    config_file: str
+    domain_id: int
+    cpus: tuple
+    output_dir: str
+    launch_args: tuple = ()
+    process: subprocess.Popen = None
+    start_time: float = None
+    elapsed: float = None
+    returncode: int = None
+    timed_out: bool = False
+
+    def environment(self):
+        env = dict(os.environ)
+        env.update({partition_env: self.name for partition_env in PARTITION_ENVS})
+        env['ROS_DOMAIN_ID'] = str(self.domain_id)
+        env['IGN_ASSETS_OUTPUT_DIR'] = self.output_dir
+        return env
+
+    def command(self):
+        return ['ros2', 'launch', 'ignition_assets', 'launch_simulation.py',
+                f'config_file:={os.path.abspath(self.config_file)}', 'headless:=true',
+                f'instance:={self.name}', f'domain_id:={self.domain_id}', *self.launch_args]
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        cpus = self.cpus
+        with open(os.path.join(self.output_dir, 'launch.log'), 'wb') as log:
+            # Own session, so the whole launch process tree is stopped at once
+            self.process = subprocess.Popen(
+                self.command(), env=self.environment(), stdout=log, stderr=subprocess.STDOUT,
+                start_new_session=True, preexec_fn=lambda: os.sched_setaffinity(0, cpus))
+        self.start_time = time.monotonic()
+
+    def poll(self):
+        # Return code once the launch exited, None while running
+        if self.returncode is None and self.process.poll() is not None:
+            self.returncode = self.process.returncode
+            self.elapsed = time.monotonic() - self.start_time
+        return self.returncode
+
+    def running_time(self):
+        return time.monotonic() - self.start_time
+
+    def stop(self, grace=10.0):
+        # SIGINT lets ros2 launch shut down its processes, SIGKILL if it hangs
+        if self.poll() is not None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGINT)
+            self.process.wait(grace)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+        except ProcessLookupError:
+            pass
+        self.poll()
+
+    def result(self):
+        return {'name': self.name, 'config_file': self.config_file,
+                'output_dir': self.output_dir, 'domain_id': self.domain_id,
+                'cpus': list(self.cpus), 'returncode': self.returncode,
+                'timed_out': self.timed_out, 'elapsed': self.elapsed}
+
+
+class Farm:
+    """
+    Run many simulation configs side by side on one host.
+
+    The available cores are split in slots of cores_per_instance cores,
+    each slot runs one instance at a time with its own ROS domain. Configs
+    wait in order for a free slot. timeout stops instances that run for
+    longer, which is how fixed duration runs end.
+    """
+
+    def __init__(self, config_files, cores_per_instance=2, output_dir=None, first_domain_id=1,
+                 timeout=None, launch_args=(), name=None):
+        self.config_files = list(config_files)
+        self.timeout = timeout
+        self.launch_args = tuple(launch_args)
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix='ign_assets_farm_')
+        # Partitions must be unique on the host, also among concurrent farms
+        self.name = name or f'farm{os.getpid()}'
+
+        cpus = sorted(os.sched_getaffinity(0))
+        cores_per_instance = max(1, min(cores_per_instance, len(cpus)))
+        self.slots = [tuple(cpus[i:i + cores_per_instance])
+                      for i in range(0, len(cpus) - cores_per_instance + 1, cores_per_instance)]
+
+        self.first_domain_id = first_domain_id
+        if first_domain_id < 0 or first_domain_id + len(self.slots) - 1 > MAX_DOMAIN_ID:
+            raise RuntimeError(f'ROS domain IDs {first_domain_id}..'
+                               f'{first_domain_id + len(self.slots) - 1} out of range '
+                               f'0..{MAX_DOMAIN_ID}, use fewer slots or a lower first ID')
+
+    def instance(self, index, slot):
+        config_file = self.config_files[index]
+        name = f'{self.name}_{index}'
+        return Instance(index, name, config_file, self.first_domain_id + slot, self.slots[slot],
+                        os.path.join(self.output_dir, name), self.launch_args)
+
+    def run(self, poll_interval=0.5):
+        # Run every config, returns their results in config order
+        pending = list(range(len(self.config_files)))
+        running = {}
+        finished = []
+        try:
+            while pending or running:
+                for slot in range(len(self.slots)):
+                    if slot in running or not pending:
+                        continue
+                    instance = self.instance(pending.pop(0), slot)
+                    instance.start()
+                    running[slot] = instance
+                    print(f'[farm] {instance.name}: {instance.config_file} on cpus '
+                          f'{",".join(map(str, instance.cpus))}, domain {instance.domain_id}',
+                          flush=True)
+
+                time.sleep(poll_interval)
+                for slot, instance in list(running.items()):
+                    if instance.poll() is None and self.timeout and \
+                            instance.running_time() > self.timeout:
+                        instance.timed_out = True
+                        instance.stop()
+                    if instance.poll() is None:
+                        continue
+                    del running[slot]
+                    finished.append(instance)
+                    print(f'[farm] {instance.name}: exited {instance.returncode}'
+                          f'{" (timeout)" if instance.timed_out else ""} '
+                          f'after {instance.elapsed:.1f} s', flush=True)
+        finally:
+            for instance in running.values():
+                instance.stop()
+
+        results = [instance.result() for instance in sorted(finished, key=lambda i: i.index)]
+        with open(os.path.join(self.output_dir, 'farm.json'), 'w') as f:
+            json.dump(results, f, indent=2)
+        return results
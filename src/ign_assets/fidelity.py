@@ -0,0 +1,210 @@
+import functools
+import json
+import math
+import os
+import xml.etree.ElementTree as ET
+
+import ign_assets.flatten
+
+
+# Payload keys that override the included sensor model parameters
+OVERRIDES = ['update_rate', 'samples', 'resolution', 'width', 'height', 'range_min', 'range_max']
+
+# Sensor family of each SDF sensor type
+SENSOR_FAMILIES = {
+    'camera': 'camera',
+    'segmentation': 'camera',
+    'rgbd_camera': 'rgbd',
+    'depth_camera': 'rgbd',
+    'gpu_ray': 'lidar',
+    'gpu_lidar': 'lidar',
+    'navsat': 'gps',
+    'imu': 'imu',
+    'magnetometer': 'magnetometer',
+    'air_pressure': 'air_pressure',
+}
+
+# Fidelity profiles, upper bounds by sensor family. Sensors already below a bound
+# are kept as they are, 'odometry' bounds the model odometry publisher rate.
+# high keeps model defaults.
+PROFILES = {
+    'low': {
+        'camera': {'update_rate': 5, 'width': 320},
+        'rgbd': {'update_rate': 5, 'width': 160},
+        'lidar': {'update_rate': 5, 'samples': [360, 8]},
+        'gps': {'update_rate': 1},
+        'imu': {'update_rate': 100},
+        'magnetometer': {'update_rate': 10},
+        'air_pressure': {'update_rate': 10},
+        'odometry': {'update_rate': 20},
+    },
+    'medium': {
+        'camera': {'update_rate': 15, 'width': 640},
+        'rgbd': {'update_rate': 10, 'width': 320},
+        'lidar': {'update_rate': 10, 'samples': [900, 16]},
+        'gps': {'update_rate': 5},
+        'imu': {'update_rate': 200},
+        'magnetometer': {'update_rate': 20},
+        'air_pressure': {'update_rate': 20},
+        'odometry': {'update_rate': 50},
+    },
+    'high': {},
+}
+
+
+def get_profile(fidelity):
+    # Profile bounds by name, None when model defaults are kept
+    if not fidelity:
+        return None
+    if fidelity not in PROFILES:
+        raise RuntimeError(f'Unknown fidelity {fidelity!r}, expected one of {list(PROFILES)}')
+    return PROFILES[fidelity] or None
+
+
+def sensor_params(sensor):
+    # Override values of a payload entry, validated and normalized
+    params = {}
+    for key in OVERRIDES:
+        if key not in sensor:
+            continue
+        value = sensor[key]
+        try:
+            if key == 'update_rate' or key.startswith('range_'):
+                params[key] = float(value)
+            elif key in ['samples', 'resolution']:
+                # samples: horizontal or [horizontal, vertical]
+                # resolution: camera [width, height]
+                values = value if isinstance(value, (list, tuple)) else [value]
+                params[key] = [int(v) for v in values]
+            else:
+                params[key] = int(value)
+        except (TypeError, ValueError):
+            raise RuntimeError(f'Invalid {key} value in payload: {value!r}')
+
+    if 'resolution' in params:
+        if len(params['resolution']) != 2:
+            raise RuntimeError('Payload resolution must be [width, height]')
+        params.setdefault('width', params['resolution'][0])
+        params.setdefault('height', params['resolution'][1])
+        del params['resolution']
+    return params
+
+
+def _set(parent, tag, value):
+    element = parent.find(tag)
+    if element is None:
+        element = ET.SubElement(parent, tag)
+    element.text = f'{value:g}' if isinstance(value, float) else str(value)
+
+
+def _resize(camera, image, width, height):
+    _set(image, 'width', width)
+    _set(image, 'height', height)
+
+    # Keep intrinsics consistent with the new image size
+    intrinsics = camera.find('lens/intrinsics')
+    if intrinsics is not None:
+        hfov = float(camera.findtext('horizontal_fov', '1.047'))
+        f = round(width / (2 * math.tan(hfov / 2)), 1)
+        _set(intrinsics, 'fx', f)
+        _set(intrinsics, 'fy', f)
+        _set(intrinsics, 'cx', (width + 1) / 2)
+        _set(intrinsics, 'cy', (height + 1) / 2)
+
+
+def _apply_camera(camera, params):
+    image = camera.find('image')
+    if image is not None and ('width' in params or 'height' in params):
+        width = params.get('width', int(image.findtext('width', '320')))
+        height = params.get('height', int(image.findtext('height', '240')))
+        _resize(camera, image, width, height)
+
+    for clip in [camera.find('clip'), camera.find('depth_camera/clip')]:
+        if clip is None:
+            continue
+        if 'range_min' in params:
+            _set(clip, 'near', params['range_min'])
+        if 'range_max' in params:
+            _set(clip, 'far', params['range_max'])
+
+
+def _apply_lidar(lidar, params):
+    if 'samples' in params:
+        for axis, samples in zip(['horizontal', 'vertical'], params['samples']):
+            scan = lidar.find(f'scan/{axis}')
+            if scan is not None:
+                _set(scan, 'samples', samples)
+
+    range_ = lidar.find('range')
+    if range_ is not None:
+        if 'range_min' in params:
+            _set(range_, 'min', params['range_min'])
+        if 'range_max' in params:
+            _set(range_, 'max', params['range_max'])
+
+
+def _bound(sensor, bounds):
+    # Lower sensor parameters to the profile bounds, never raise them
+    if 'update_rate' in bounds:
+        rate = float(sensor.findtext('update_rate', 'inf'))
+        if rate > bounds['update_rate']:
+            _set(sensor, 'update_rate', bounds['update_rate'])
+
+    camera = sensor.find('camera')
+    image = camera.find('image') if camera is not None else None
+    if image is not None and 'width' in bounds:
+        width = int(image.findtext('width', '320'))
+        height = int(image.findtext('height', '240'))
+        if width > bounds['width']:
+            # Keep aspect ratio
+            _resize(camera, image, bounds['width'], round(height * bounds['width'] / width))
+
+    lidar = sensor.find('lidar')
+    if lidar is not None and 'samples' in bounds:
+        for axis, max_samples in zip(['horizontal', 'vertical'], bounds['samples']):
+            scan = lidar.find(f'scan/{axis}')
+            if scan is not None and int(scan.findtext('samples', '1')) > max_samples:
+                _set(scan, 'samples', max_samples)
+
+
+def apply(model, params, profile=None):
+    # Apply profile bounds and then override params to every sensor of a parsed <model>
+    for sensor in model.iter('sensor'):
+        family = SENSOR_FAMILIES.get(sensor.get('type'))
+        if profile and family in profile:
+            _bound(sensor, profile[family])
+        if 'update_rate' in params:
+            _set(sensor, 'update_rate', params['update_rate'])
+        camera = sensor.find('camera')
+        if camera is not None:
+            _apply_camera(camera, params)
+        lidar = sensor.find('lidar')
+        if lidar is not None:
+            _apply_lidar(lidar, params)
+
+
+@functools.lru_cache(maxsize=256)
+def _model_sdf(filepath, mtime_ns, params, fidelity, merge):
+    model = ET.parse(filepath).getroot().find('model')
+    apply(model, json.loads(params), get_profile(fidelity))
+    # Model contents only, the including template sets the model name and pose
+    children = [child for child in model if child.tag != 'pose']
+    if merge:
+        children = ign_assets.flatten.merged(model, children)
+    for child in children:
+        child.tail = None
+        ET.indent(child, space='    ')
+    return '\n'.join(ET.tostring(child, encoding='unicode') for child in children)
+
+
+def model_sdf(models_dir, model_name, params=None, fidelity=None, merge=False):
+    """
+    Contents of a model with fidelity profile bounds and override params applied.
+
+    Rendered inline in place of the model:// include, so every instance
+    can carry its own rates, resolutions and ranges. merge renders the
+    contents of an <include merge="true">.
+    """
+    filepath = ign_assets.flatten.model_sdf_file(models_dir, model_name)
+    return _model_sdf(filepath, os.stat(filepath).st_mtime_ns,
+                      json.dumps(params or {}, sort_keys=True), fidelity, merge)
@@ -0,0 +1,121 @@
+import os
+import xml.etree.ElementTree as ET
+
+import ign_assets.lod
+import ign_assets.resources
+
+
+MODEL_URI_SCHEME = 'model://'
+
+
+def model_sdf_file(models_dir, model_name):
+    # SDF file of a model, as declared in its model.config
+    return sdf_file(os.path.join(models_dir, model_name))
+
+
+def sdf_file(model_path):
+    config = ET.parse(os.path.join(model_path, 'model.config')).getroot()
+    sdf = config.find('sdf')
+    if sdf is None or not sdf.text:
+        raise RuntimeError(f'No sdf file declared in {model_path}/model.config')
+    return os.path.join(model_path, sdf.text.strip())
+
+
+def find_model(model_name, models_dir):
+    # Model directory, looked up in models_dir first and then in the resource path
+    model_path = os.path.join(models_dir, model_name)
+    if os.path.exists(os.path.join(model_path, 'model.config')):
+        return model_path
+    model_path = ign_assets.resources.default_index().find_model(model_name)
+    if model_path is None:
+        raise RuntimeError(f'Model {model_name} not found in {models_dir} or resource paths')
+    return model_path
+
+
+def resolve_uri(uri, models_dir, base_dir=None):
+    # Absolute file:// URI of a model:// or model relative URI, others are kept
+    uri = uri.strip()
+    if uri.startswith(MODEL_URI_SCHEME):
+        model_name, _, path = uri[len(MODEL_URI_SCHEME):].partition('/')
+        return 'file://' + os.path.join(find_model(model_name, models_dir), path)
+    if base_dir and '://' not in uri and not os.path.isabs(uri):
+        return 'file://' + os.path.join(base_dir, uri)
+    return uri
+
+
+def merged(model, children):
+    # Contents of a merge include: the model pose becomes a frame the top level
+    # links, frames and nested models are placed relative to, as sdformat does
+    pose = model.find('pose')
+    if pose is None:
+        return children
+
+    frame_name = f"_merged__{model.get('name')}__model__"
+    frame = ET.Element('frame', name=frame_name)
+    frame.append(pose)
+    for child in children:
+        if child.tag not in ['link', 'frame', 'model'] or child.get('attached_to'):
+            continue
+        child_pose = child.find('pose')
+        if child_pose is None:
+            child_pose = ET.Element('pose')
+            child_pose.text = '0 0 0 0 0 0'
+            child.insert(0, child_pose)
+        if not child_pose.get('relative_to'):
+            child_pose.set('relative_to', frame_name)
+    return [frame, *children]
+
+
+def _expand(include, models_dir):
+    # Elements replacing an <include> of a model:// URI
+    uri = include.findtext('uri', '').strip()
+    model_name = uri[len(MODEL_URI_SCHEME):].strip('/')
+    model_file = sdf_file(find_model(model_name, models_dir))
+    model = ET.parse(model_file).getroot().find('model')
+    flatten_element(model, models_dir, os.path.dirname(model_file))
+
+    if include.findtext('name'):
+        model.set('name', include.findtext('name').strip())
+    pose = include.find('pose')
+    if pose is not None:
+        for old in model.findall('pose'):
+            model.remove(old)
+        model.insert(0, pose)
+    static = include.find('static')
+    if static is not None:
+        model.append(static)
+    for plugin in include.findall('plugin'):
+        model.append(plugin)
+
+    if include.get('merge') == 'true':
+        return merged(model, [child for child in model if child.tag != 'pose'])
+    return [model]
+
+
+def flatten_element(element, models_dir, base_dir=None):
+    # Expand model:// includes and make URIs absolute in place, recursively
+    for i, child in reversed(list(enumerate(element))):
+        if child.tag == 'include' and \
+                child.findtext('uri', '').strip().startswith(MODEL_URI_SCHEME):
+            element.remove(child)
+            for j, expanded in enumerate(_expand(child, models_dir)):
+                element.insert(i + j, expanded)
+        elif child.tag == 'uri' and child.text:
+            child.text = resolve_uri(child.text, models_dir, base_dir)
+        else:
+            flatten_element(child, models_dir, base_dir)
+
+
+def flatten(sdf, models_dir, lod=None):
+    """
+    Self-contained form of an SDF string.
+
+    model:// includes are expanded inline, recursively, and mesh URIs
+    rewritten to absolute file:// paths, so the server loads a single file
+    without resource path lookups. lod points meshes at their LOD variants.
+    """
+    root = ET.fromstring(sdf)
+    flatten_element(root, models_dir)
+    ign_assets.lod.apply(root, lod)
+    ET.indent(root, space='  ')
+    return '<?xml version="1.0" ?>\n' + ET.tostring(root, encoding='unicode') + '\n'
@@ -0,0 +1,427 @@
+import functools
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import xml.etree.ElementTree as ET
+
+
+COLLADA_NS = 'http://www.collada.org/2005/11/COLLADASchema'
+NS = {'c': COLLADA_NS}
+
+# Decimated files keep COLLADA as default namespace
+ET.register_namespace('', COLLADA_NS)
+
+# Mesh levels of detail. Visual meshes are decimated to a grid of 'cells' cells
+# along their bounding box diagonal, 'collision' replaces mesh collisions by a
+# 'box' or 'convex' proxy. high keeps the original meshes.
+LODS = {
+    'low': {'cells': 24, 'collision': 'box'},
+    'medium': {'cells': 64, 'collision': None},
+    'high': {},
+}
+
+
+def get_lod(lod):
+    # LOD settings by name, None when original meshes are kept
+    if not lod:
+        return None
+    if lod not in LODS:
+        raise RuntimeError(f'Unknown lod {lod!r}, expected one of {list(LODS)}')
+    return LODS[lod] or None
+
+
+def default_lod_dir():
+    # Next to the SDF cache (see ign_assets.cache)
+    if 'IGN_ASSETS_CACHE_DIR' in os.environ:
+        return os.path.join(os.environ['IGN_ASSETS_CACHE_DIR'], 'lod')
+    cache_home = os.getenv('XDG_CACHE_HOME', default=os.path.expanduser('~/.cache'))
+    return os.path.join(cache_home, 'ignition_assets', 'lod')
+
+
+def _tag(element):
+    return element.tag.rpartition('}')[2]
+
+
+def _source(mesh, url):
+    return mesh.find(f"c:source[@id='{url.lstrip('#')}']", NS)
+
+
+def _stride(source):
+    accessor = source.find('c:technique_common/c:accessor', NS)
+    return int(accessor.get('stride', '1')) if accessor is not None else 1
+
+
+def _floats(source):
+    values = [float(v) for v in source.findtext('c:float_array', '', NS).split()]
+    stride = _stride(source)
+    return [values[i:i + stride] for i in range(0, len(values), stride)]
+
+
+def _set_floats(source, values):
+    float_array = source.find('c:float_array', NS)
+    flat = [v for value in values for v in value]
+    float_array.text = ' '.join(f'{v:.6g}' for v in flat)
+    float_array.set('count', str(len(flat)))
+    accessor = source.find('c:technique_common/c:accessor', NS)
+    if accessor is not None:
+        accessor.set('count', str(len(values)))
+
+
+def _inputs(mesh, primitive):
+    # (semantic, offset, source) of a primitive, VERTEX resolved to its positions
+    inputs = []
+    for input_ in primitive.findall('c:input', NS):
+        semantic, source = input_.get('semantic'), input_.get('source')
+        if semantic == 'VERTEX':
+            vertices = mesh.find('c:vertices', NS)
+            source = vertices.find("c:input[@semantic='POSITION']", NS).get('source')
+        inputs.append((semantic, int(input_.get('offset', '0')), source))
+    return inputs
+
+
+def _corner_triangles(primitive, stride):
+    # Fan triangulated polygons, each corner an index tuple of every input offset
+    p = [int(i) for i in primitive.findtext('c:p', '', NS).split()]
+    corners = [tuple(p[i:i + stride]) for i in range(0, len(p), stride)]
+    if _tag(primitive) == 'polylist':
+        vcount = [int(n) for n in primitive.findtext('c:vcount', '', NS).split()]
+    else:
+        vcount = [3] * (len(corners) // 3)
+    triangles, k = [], 0
+    for n in vcount:
+        for j in range(1, n - 1):
+            triangles.append((corners[k], corners[k + j], corners[k + j + 1]))
+        k += n
+    return triangles
+
+
+def _primitives(mesh):
+    # Triangle primitives of a mesh, None if it holds anything else
+    primitives = [child for child in mesh if _tag(child) not in ['source', 'vertices', 'extra']]
+    if not primitives or any(_tag(p) not in ['triangles', 'polylist'] for p in primitives):
+        return None
+    return primitives
+
+
+def _cluster(points, cells):
+    # Vertex clustering: points in the same grid cell merge into their mean
+    lo = [min(p[i] for p in points) for i in range(3)]
+    hi = [max(p[i] for p in points) for i in range(3)]
+    size = math.dist(lo, hi) / cells or 1.0
+    cell_index, sums, index = {}, [], []
+    for p in points:
+        key = tuple(int((p[i] - lo[i]) / size) for i in range(3))
+        j = cell_index.setdefault(key, len(cell_index))
+        if j == len(sums):
+            sums.append([0.0, 0.0, 0.0, 0])
+        s = sums[j]
+        s[0] += p[0]
+        s[1] += p[1]
+        s[2] += p[2]
+        s[3] += 1
+        index.append(j)
+    return index, [(s[0] / s[3], s[1] / s[3], s[2] / s[3]) for s in sums]
+
+
+def _decimate_mesh(mesh, cells):
+    primitives = _primitives(mesh)
+    if primitives is None:
+        return
+
+    positions_url = mesh.find("c:vertices/c:input[@semantic='POSITION']", NS).get('source')
+    positions = _source(mesh, positions_url)
+    cluster, centers = _cluster(_floats(positions), cells)
+
+    # Collapse triangles to cluster indices, dropping degenerate and duplicate ones
+    kept, seen = [], set()
+    for primitive in primitives:
+        inputs = _inputs(mesh, primitive)
+        stride = max(offset for _, offset, _ in inputs) + 1
+        vertex = next(offset for semantic, offset, _ in inputs if semantic == 'VERTEX')
+        triangles = []
+        for corners in _corner_triangles(primitive, stride):
+            corners = [c[:vertex] + (cluster[c[vertex]],) + c[vertex + 1:] for c in corners]
+            ids = frozenset(c[vertex] for c in corners)
+            if len(ids) == 3 and ids not in seen:
+                seen.add(ids)
+                triangles.append(corners)
+        kept.append((primitive, inputs, triangles))
+
+    # Compact every source to the entries still referenced
+    used = {}
+    for _, inputs, triangles in kept:
+        for _, offset, url in inputs:
+            indices = used.setdefault(url, {})
+            for corners in triangles:
+                for c in corners:
+                    indices.setdefault(c[offset], len(indices))
+
+    for url, indices in used.items():
+        source = _source(mesh, url)
+        values = centers if url == positions_url else _floats(source)
+        _set_floats(source, [values[i] for i in indices])
+
+    for primitive, inputs, triangles in kept:
+        stride = max(offset for _, offset, _ in inputs) + 1
+        remap = [None] * stride
+        for _, offset, url in inputs:
+            remap[offset] = used[url]
+        p = [str(remap[i][c[i]]) if remap[i] is not None else str(c[i])
+             for corners in triangles for c in corners for i in range(stride)]
+
+        primitive.tag = f'{{{COLLADA_NS}}}triangles'
+        primitive.set('count', str(len(triangles)))
+        vcount = primitive.find('c:vcount', NS)
+        if vcount is not None:
+            primitive.remove(vcount)
+        primitive.find('c:p', NS).text = ' '.join(p)
+
+
+def _matmul(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)]
+
+
+def _diagonal(x, y, z):
+    return [[x, 0, 0, 0], [0, y, 0, 0], [0, 0, z, 0], [0, 0, 0, 1]]
+
+
+def _node_matrix(node):
+    # Node transform, composed from its transformation elements in document order
+    m = _diagonal(1, 1, 1)
+    for child in node:
+        tag = _tag(child)
+        if tag not in ['matrix', 'translate', 'scale', 'rotate']:
+            continue
+        values = [float(v) for v in child.text.split()]
+        if tag == 'matrix':
+            t = [values[i:i + 4] for i in range(0, 16, 4)]
+        elif tag == 'translate':
+            t = _diagonal(1, 1, 1)
+            for i in range(3):
+                t[i][3] = values[i]
+        elif tag == 'scale':
+            t = _diagonal(*values)
+        elif tag == 'rotate':
+            x, y, z, angle = values
+            norm = math.sqrt(x * x + y * y + z * z) or 1.0
+            x, y, z = x / norm, y / norm, z / norm
+            c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+            t = [[c + x * x * (1 - c), x * y * (1 - c) - z * s, x * z * (1 - c) + y * s, 0],
+                 [y * x * (1 - c) + z * s, c + y * y * (1 - c), y * z * (1 - c) - x * s, 0],
+                 [z * x * (1 - c) - y * s, z * y * (1 - c) + x * s, c + z * z * (1 - c), 0],
+                 [0, 0, 0, 1]]
+        m = _matmul(m, t)
+    return m
+
+
+def _instances(root):
+    # (geometry, transform) of every geometry instanced by the scene, in meters
+    unit = root.find('c:asset/c:unit', NS)
+    meter = float(unit.get('meter', '1')) if unit is not None else 1.0
+    scenes = root.findall('c:library_visual_scenes/c:visual_scene', NS)
+    scene = root.find('c:scene/c:instance_visual_scene', NS)
+    if scene is not None:
+        url = scene.get('url', '').lstrip('#')
+        scenes = [s for s in scenes if s.get('id') == url] or scenes
+
+    def walk(node, parent):
+        m = _matmul(parent, _node_matrix(node))
+        for instance in node.findall('c:instance_geometry', NS):
+            url = instance.get('url', '').lstrip('#')
+            geometry = root.find(f"c:library_geometries/c:geometry[@id='{url}']", NS)
+            if geometry is not None:
+                yield geometry, m
+        for child in node.findall('c:node', NS):
+            yield from walk(child, m)
+
+    for scene in scenes[:1]:
+        for node in scene.findall('c:node', NS):
+            yield from walk(node, _diagonal(meter, meter, meter))
+
+
+def triangles(root):
+    # Scene triangles of a parsed COLLADA file, as transformed vertex triples
+    result = []
+    for geometry, m in _instances(root):
+        mesh = geometry.find('c:mesh', NS)
+        primitives = _primitives(mesh) if mesh is not None else None
+        if primitives is None:
+            continue
+        url = mesh.find("c:vertices/c:input[@semantic='POSITION']", NS).get('source')
+        positions = [tuple(sum(m[i][k] * p[k] for k in range(3)) + m[i][3] for i in range(3))
+                     for p in _floats(_source(mesh, url))]
+        for primitive in primitives:
+            inputs = _inputs(mesh, primitive)
+            stride = max(offset for _, offset, _ in inputs) + 1
+            vertex = next(offset for semantic, offset, _ in inputs if semantic == 'VERTEX')
+            for corners in _corner_triangles(primitive, stride):
+                result.append(tuple(positions[c[vertex]] for c in corners))
+    return result
+
+
+def _stl(triangles):
+    # Binary STL contents
+    data = [b'ign_assets lod'.ljust(80, b'\0'), struct.pack('<I', len(triangles))]
+    for a, b, c in triangles:
+        u = [b[i] - a[i] for i in range(3)]
+        v = [c[i] - a[i] for i in range(3)]
+        n = [u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0]]
+        norm = math.sqrt(sum(x * x for x in n)) or 1.0
+        data.append(struct.pack('<12fH', *[x / norm for x in n], *a, *b, *c, 0))
+    return b''.join(data)
+
+
+def decimate(filepath, cells):
+    # Parsed COLLADA file with every triangle mesh decimated, standalone from its directory
+    root = ET.parse(filepath).getroot()
+    base_dir = os.path.dirname(os.path.abspath(filepath))
+    for init_from in root.iterfind('c:library_images/c:image/c:init_from', NS):
+        texture = (init_from.text or '').strip()
+        if texture and '://' not in texture and not os.path.isabs(texture):
+            init_from.text = os.path.normpath(os.path.join(base_dir, texture))
+    for mesh in root.iterfind('c:library_geometries/c:geometry/c:mesh', NS):
+        _decimate_mesh(mesh, cells)
+    return root
+
+
+@functools.lru_cache(maxsize=1024)
+def _digest(filepath, mtime_ns, size):
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _lod_path(filepath, suffix, lod_dir=None):
+    # Variants are keyed on the source contents, edited meshes get new variants
+    st = os.stat(filepath)
+    digest = _digest(os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(lod_dir or default_lod_dir(), digest[:16], name + suffix)
+
+
+def _write(filepath, data):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    # Write to a temporary file first so concurrent readers never see partial files
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, filepath)
+
+
+def mesh_file(filepath, lod, lod_dir=None, binary=False):
+    """
+    LOD variant of a COLLADA mesh, written on first use.
+
+    binary writes a binary STL instead, faster to load but without
+    materials or textures. high returns the original mesh.
+    """
+    lod_settings = get_lod(lod)
+    if not lod_settings:
+        return filepath
+    variant = _lod_path(filepath, f'_{lod}.stl' if binary else f'_{lod}.dae', lod_dir)
+    if not os.path.exists(variant):
+        root = decimate(filepath, lod_settings['cells'])
+        if binary:
+            data = _stl(triangles(root))
+        else:
+            data = ET.tostring(root, encoding='utf-8', xml_declaration=True)
+        _write(variant, data)
+    return variant
+
+
+def convex_file(filepath, lod_dir=None):
+    # Convex hull of a COLLADA mesh as binary STL, written on first use
+    variant = _lod_path(filepath, '_convex.stl', lod_dir)
+    if not os.path.exists(variant):
+        try:
+            import trimesh
+        except ImportError:
+            raise RuntimeError('Convex collision proxies need trimesh (pip install trimesh scipy), '
+                               'use box proxies instead')
+        points = [p for triangle in triangles(ET.parse(filepath).getroot()) for p in triangle]
+        _write(variant, _stl(trimesh.Trimesh(vertices=points).convex_hull.triangles.tolist()))
+    return variant
+
+
+@functools.lru_cache(maxsize=256)
+def _bounds(filepath, mtime_ns):
+    points = [p for triangle in triangles(ET.parse(filepath).getroot()) for p in triangle]
+    return ([min(p[i] for p in points) for i in range(3)],
+            [max(p[i] for p in points) for i in range(3)])
+
+
+def bounds(filepath):
+    # Axis aligned bounding box of a COLLADA mesh, as (min, max) corners
+    return _bounds(os.path.abspath(filepath), os.stat(filepath).st_mtime_ns)
+
+
+def _rotate(v, roll, pitch, yaw):
+    # v rotated by fixed axis roll, pitch and yaw, as SDF poses are
+    x, y, z = v
+    cr, sr = math.cos(roll), math.sin(roll)
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    cy, sy = math.cos(yaw), math.sin(yaw)
+    y, z = cr * y - sr * z, sr * y + cr * z
+    x, z = cp * x + sp * z, -sp * x + cp * z
+    x, y = cy * x - sy * y, sy * x + cy * y
+    return x, y, z
+
+
+def _box_collision(collision, filepath, scale):
+    pose = collision.find('pose')
+    values = [float(v) for v in (pose.text or '').split()] if pose is not None else [0.0] * 6
+    if len(values) != 6:
+        # Quaternion poses, keep the mesh
+        return
+    lo, hi = bounds(filepath)
+    size = [(hi[i] - lo[i]) * scale[i] for i in range(3)]
+    center = _rotate([(hi[i] + lo[i]) / 2 * scale[i] for i in range(3)], *values[3:])
+
+    # The box is centered on the mesh bounds, shift the collision pose accordingly
+    if pose is None:
+        pose = ET.Element('pose')
+        collision.insert(0, pose)
+    pose.text = ' '.join(f'{v:.6g}' for v in [*(values[i] + center[i] for i in range(3)),
+                                               *values[3:]])
+    geometry = collision.find('geometry')
+    geometry.clear()
+    box = ET.SubElement(geometry, 'box')
+    ET.SubElement(box, 'size').text = ' '.join(f'{v:.6g}' for v in size)
+
+
+def _mesh_file(mesh):
+    # Local COLLADA file of a flattened <mesh>, None for other URIs
+    uri = mesh.findtext('uri', '').strip()
+    if not uri.startswith('file://') or not uri.lower().endswith('.dae'):
+        return None
+    filepath = uri[len('file://'):]
+    return filepath if os.path.exists(filepath) else None
+
+
+def apply(root, lod, lod_dir=None):
+    # Point visual meshes of a flattened SDF at their LOD variants, and replace
+    # mesh collisions by proxies, in place
+    lod_settings = get_lod(lod)
+    if not lod_settings:
+        return
+
+    for collision in root.iter('collision'):
+        mesh = collision.find('geometry/mesh')
+        filepath = _mesh_file(mesh) if mesh is not None else None
+        if filepath is None or not lod_settings['collision']:
+            continue
+        if lod_settings['collision'] == 'box':
+            scale = [float(v) for v in mesh.findtext('scale', '1 1 1').split()]
+            _box_collision(collision, filepath, scale)
+        else:
+            mesh.find('uri').text = 'file://' + convex_file(filepath, lod_dir)
+            for submesh in mesh.findall('submesh'):
+                mesh.remove(submesh)
+
+    for visual in root.iter('visual'):
+        for mesh in visual.iter('mesh'):
+            filepath = _mesh_file(mesh)
+            if filepath is not None:
+                mesh.find('uri').text = 'file://' + mesh_file(filepath, lod, lod_dir)
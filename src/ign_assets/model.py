@@ -12,15 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import codecs
+import functools
 import os
-import subprocess
+import tempfile
 
 from ament_index_python.packages import get_package_share_directory
 
-from launch_ros.actions import Node
+from launch_ros.actions import ComposableNodeContainer, Node
+from launch_ros.descriptions import ComposableNode
 
+from rosidl_runtime_py.utilities import get_message
+
+import ign_assets.bridge
 import ign_assets.bridges
+import ign_assets.cache
+import ign_assets.fidelity
+import ign_assets.lod
+import ign_assets.render
+import ign_assets.resources
+import ign_assets.sensors
+import ign_assets.stream
+
+import jinja2
 
 import yaml
 import json
@@ -32,35 +45,142 @@ UAVS = [
 ]
 
 
-# TODO: semantic_camera segmentation
+# Sensor models by family, see ign_assets.sensors
 def camera_models():
-    models = ['vga_camera',
-              'hd_camera',
-              'semantic_camera']
-    return models
+    return ign_assets.sensors.registry.models('camera')
 
 
 def rgbd_models():
-    models = ['rgbd_camera']
-    return models
+    return ign_assets.sensors.registry.models('rgbd')
 
 
-# FIXME: point_lidar scan not working properly
 def lidar_models():
-    models = ['planar_lidar',
-              'lidar_3d',
-              'point_lidar']
-    return models
+    return ign_assets.sensors.registry.models('lidar')
 
 
 def gps_models():
-    models = ['gps']
-    return models
+    return ign_assets.sensors.registry.models('gps')
 
 
 def suction_gripper_models():
-    models = ['suction_gripper']
-    return models
+    return ign_assets.sensors.registry.models('suction_gripper')
+
+
+def default_output_dir():
+    # Rendered SDF directory, set per simulation instance (see ign_assets.farm)
+    return os.getenv('IGN_ASSETS_OUTPUT_DIR', default=tempfile.gettempdir())
+
+
+@functools.lru_cache(maxsize=None)
+def package_share_directory():
+    return get_package_share_directory('ignition_assets')
+
+
+def custom_bridge(executable, plugin, namespace, parameters, composable=False, name=None):
+    # Custom bridge as a standalone node or as a component to load into a container
+    if composable:
+        return ComposableNode(
+            package='ignition_assets',
+            plugin=f'ignition_assets::{plugin}',
+            name=name or executable,
+            namespace=namespace,
+            parameters=parameters,
+            extra_arguments=[{'use_intra_process_comms': True}]
+        )
+    return Node(
+        package='ignition_assets',
+        executable=executable,
+        name=name,
+        namespace=namespace,
+        output='screen',
+        parameters=parameters
+    )
+
+
+def parameter_bridge(bridges, name=None, namespace='', config_file=None):
+    # ros_gz_bridge node reading its bridges from a YAML config file instead of argv,
+    # QoS policies other than depth are set through parameter overrides
+    parameters = {'config_file': ign_assets.bridge.write_config(bridges, config_file)}
+    for bridge in bridges:
+        parameters.update(bridge.qos_overrides(namespace))
+    return Node(
+        package='ros_gz_bridge',
+        executable='parameter_bridge',
+        name=name,
+        namespace=namespace,
+        output='screen',
+        parameters=[parameters]
+    )
+
+
+def tf_aggregator(world_name, model_names=(), composable=False):
+    # Single /tf and /tf_static publisher for the pose vectors of every model,
+    # replaces the per model pose bridges (see Model.tf_aggregation)
+    parameters = {'world_name': world_name}
+    if model_names:
+        # Every model publishing poses otherwise, also the ones spawned later
+        parameters['model_names'] = list(model_names)
+    return custom_bridge('tf_aggregator', 'TfAggregator', '', [parameters], composable)
+
+
+def swarm_ground_truth(world_name, stream, rate, model_names=(), composable=False):
+    # Ground truth of every model in one message on /swarm/ground_truth/<stream>,
+    # at most rate Hz of simulation time, every tick if 0
+    parameters = {'world_name': world_name, 'rate': float(rate),
+                  'topic': f'/swarm/ground_truth/{stream}'}
+    if model_names:
+        parameters['model_names'] = list(model_names)
+    return custom_bridge('swarm_ground_truth', 'SwarmGroundTruth', '', [parameters], composable,
+                         name=f'swarm_ground_truth_{stream}')
+
+
+def _stamped(ros_type):
+    # Messages starting with a header or a time, their stamps give bridge latencies
+    try:
+        fields = get_message(ros_type).get_fields_and_field_types()
+    except (AttributeError, ModuleNotFoundError, ValueError):
+        return False
+    return next(iter(fields.values()), None) in ['std_msgs/Header', 'builtin_interfaces/Time']
+
+
+def bridge_diagnostics(world_name, models, output_file='', period=1.0, composable=False,
+                       lazy=False):
+    # Rate, bandwidth, latency and drops of the parameter bridges of each model, as
+    # Model.bridges() returns them, on /diagnostics every period seconds.
+    # Also written to output_file if given: CSV rows per period for *.csv, run totals
+    # as JSON otherwise.
+    # Lazy bridges are left out unless lazy: watching either of their sides would start
+    # the heavy streams (sensor rendering, conversion) they only run for real readers
+    entries = [(model.model_name, bridge.namespaced(model.model_name))
+               for model in models for bridge in model.bridges(world_name)[0]
+               if lazy or not bridge.lazy]
+    if not entries:
+        raise RuntimeError('Bridge diagnostics without bridges')
+    parameters = {
+        'world_name': world_name,
+        'period': float(period),
+        'output_file': os.path.abspath(output_file) if output_file else '',
+        'drones': [drone for drone, _ in entries],
+        'ign_topics': [bridge.ign_topic for _, bridge in entries],
+        'ros_topics': [bridge.ros_topic for _, bridge in entries],
+        'ros_types': [bridge.ros_type for _, bridge in entries],
+        'directions': [ign_assets.bridge.CONFIG_DIRECTIONS[bridge.direction]
+                       for _, bridge in entries],
+        'stamped': [_stamped(bridge.ros_type) for _, bridge in entries],
+    }
+    return custom_bridge('bridge_diagnostics', 'BridgeDiagnostics', '', [parameters], composable)
+
+
+def bridge_container(composable_nodes, name='custom_bridges', namespace=''):
+    # Single process container for custom bridge components
+    return ComposableNodeContainer(
+        name=name,
+        namespace=namespace,
+        package='rclcpp_components',
+        executable='component_container',
+        output='screen',
+        composable_node_descriptions=composable_nodes
+    )
 
 
 class Model:
@@ -73,11 +193,16 @@ class Model:
         self.flight_time = 0
         self.battery_capacity = 0
         self.payload = {}
+        self.fidelity = None
+        self.lod = None
+        self.odom_rate = None
+        # Poses bridged by the swarm tf_aggregator instead of the model bridges
+        self.tf_aggregation = False
 
     def __repr__(self) -> str:
         return f"{self.model_name}[{self.model_type}]"
 
-    def bridges(self, world_name):
+    def bridges(self, world_name, composable=False):
         bridges = [
             # IMU
             ign_assets.bridges.imu(world_name, self.model_name, 'imu', 'internal'),
@@ -87,52 +212,48 @@ class Model:
             ign_assets.bridges.air_pressure(world_name, self.model_name, 'air_pressure', 'internal'),
             # odom: not used, use ground_truth instead
             # ign_assets.bridges.odom(self.model_name),
-            # pose
-            ign_assets.bridges.pose(self.model_name),
-            # pose static
-            ign_assets.bridges.pose_static(self.model_name),
             # twist
             ign_assets.bridges.cmd_vel(self.model_name),
             # arm
             ign_assets.bridges.arm(self.model_name)
         ]
+        if not self.tf_aggregation:
+            # pose and pose static
+            bridges.append(ign_assets.bridges.pose(self.model_name))
+            bridges.append(ign_assets.bridges.pose_static(self.model_name))
         if self.battery_capacity != 0:
             bridges.append(ign_assets.bridges.battery(self.model_name))
         nodes = [
             # Odom --> ground_truth
-            Node(
-                package='ignition_assets',
-                executable='ground_truth_bridge',
-                namespace=self.model_name,
-                output='screen',
-                parameters=[
+            custom_bridge(
+                'ground_truth_bridge', 'GroundTruthBridge', self.model_name,
+                [
                     {'name_space': self.model_name,
                      'pose_frame_id': 'earth',
                      'twist_frame_id': self.model_name + '/base_link'},
-                ]
+                ],
+                composable
             ),
-            # Node(
-            #     package='ignition_assets',
-            #     executable='tf_broadcaster',
-            #     namespace=self.model_name,
-            #     output='screen',
-            #     parameters=[
+            # custom_bridge(
+            #     'tf_broadcaster', 'FramePublisher', self.model_name,
+            #     [
             #         {
             #             'world_frame': world_name,
             #             'name_space': self.model_name
             #         }
-            #     ]
+            #     ],
+            #     composable
             # )
         ]
 
-        bridges_, nodes_ = self.payload_bridges(world_name)
+        bridges_, nodes_ = self.payload_bridges(world_name, composable=composable)
 
         bridges.extend(bridges_)
         nodes.extend(nodes_)
 
         return bridges, nodes
 
-    def payload_bridges(self, world_name, payloads=None):
+    def payload_bridges(self, world_name, payloads=None, composable=False):
         if not payloads:
             payloads = self.payload
 
@@ -148,60 +269,25 @@ class Model:
             model_prefix = sensor_name
 
             bridges_, nodes_ = self.sensor_bridges(
-                    world_name, self.model_name, sensor_type, sensor_name, model_prefix)
+                    world_name, self.model_name, sensor_type, sensor_name, model_prefix, composable)
             bridges.extend(bridges_)
             nodes.extend(nodes_)
         return bridges, nodes
 
     @staticmethod
-    def sensor_bridges(world_name, model_name, payload, sensor_name, model_prefix=''):
-        bridges = []
-        nodes = []
-        if payload in camera_models():
-            bridges = [
-                ign_assets.bridges.image(world_name, model_name, sensor_name,
-                                         payload, model_prefix),
-                ign_assets.bridges.camera_info(world_name, model_name,
-                                               sensor_name, payload, model_prefix)
-            ]
-        elif payload in lidar_models():
-            bridges = [
-                ign_assets.bridges.lidar_scan(world_name, model_name, sensor_name, payload, model_prefix),
-                ign_assets.bridges.lidar_points(world_name, model_name, sensor_name, payload, model_prefix)
-            ]
-        elif payload in rgbd_models():
-            bridges = [
-                ign_assets.bridges.image(world_name, model_name, sensor_name, payload, model_prefix),
-                ign_assets.bridges.camera_info(world_name, model_name, sensor_name, payload, model_prefix),
-                ign_assets.bridges.depth_image(world_name, model_name, sensor_name, payload, model_prefix),
-                ign_assets.bridges.camera_points(world_name, model_name, sensor_name, payload, model_prefix)
-            ]
-        elif payload in gps_models():
-            # bridges = [
-            #     ign_assets.bridges.navsat(world_name, model_name, sensor_name, payload, model_prefix)
-            # ]
-            nodes.append(Node(
-                package='ignition_assets',
-                executable='gps_bridge',
-                namespace=model_name,
-                output='screen',
-                parameters=[
-                    {'world_name': world_name,
-                     'name_space': model_name,
-                     'sensor_name': sensor_name,
-                     'link_name': payload,
-                     'sensor_type': 'navsat'}
-                ]
-            ))
-        elif payload in suction_gripper_models():
-            bridges = [
-                ign_assets.bridges.gripper_suction_control(model_name),
-                ign_assets.bridges.gripper_contact(model_name, 'center'),
-                ign_assets.bridges.gripper_contact(model_name, 'left'),
-                ign_assets.bridges.gripper_contact(model_name, 'right'),
-                ign_assets.bridges.gripper_contact(model_name, 'top'),
-                ign_assets.bridges.gripper_contact(model_name, 'bottom')
-            ]
+    def sensor_bridges(world_name, model_name, payload, sensor_name, model_prefix='',
+                       composable=False):
+        # Bridges and custom bridge nodes of a sensor model, from the sensor registry
+        sensor = ign_assets.sensors.registry.get(payload)
+        if sensor is None:
+            return [], []
+
+        bridges = [factory(world_name, model_name, sensor_name, payload, model_prefix)
+                   for factory in sensor.bridges]
+        nodes = [custom_bridge(c.executable, c.plugin, model_name,
+                               [c.parameters(world_name, model_name, sensor_name, payload)],
+                               composable)
+                 for c in sensor.custom_bridges]
         return bridges, nodes
 
     def set_flight_time(self, flight_time):
@@ -216,51 +302,81 @@ class Model:
     def set_payload(self, payload):
         self.payload = payload
 
-    def generate(self):
-        # Generate SDF by executing JINJA and populating templates
-
-        # TODO: look for file in all IGN_GAZEBO_RESOURCE_PATH
-        model_dir = os.path.join(get_package_share_directory('ignition_assets'), 'models')
-        jinja_script = os.path.join(get_package_share_directory('ignition_assets'), 'scripts')
-
-        payload = ""
-        for sensor_name, sensor in self.payload.items():
-            if 'sensor' not in sensor:
-                continue
-            sensor_type = sensor['sensor']
-
-            x_s, y_s, z_s = 0, 0, 0
-            if 'xyz' in sensor:
-                x_s, y_s, z_s = sensor['xyz']
-
-            roll_s, pitch_s, yaw_s = 0, 0, 0
-            if 'rpy' in sensor:
-                roll_s, pitch_s, yaw_s = sensor['rpy']
-
-            payload += f"{sensor_name} {sensor_type} {x_s} {y_s} {z_s} {roll_s} {pitch_s} {yaw_s} "
-
-        command = ['python3', f'{jinja_script}/jinja_gen.py', f'{model_dir}/{self.model_type}/{self.model_type}.sdf.jinja', \
+    def set_fidelity(self, fidelity):
+        # Sensor fidelity profile (low, medium, high), None keeps model defaults
+        ign_assets.fidelity.get_profile(fidelity)
+        self.fidelity = fidelity
+
+    def set_lod(self, lod):
+        # Mesh level of detail (low, medium, high), None keeps original meshes
+        ign_assets.lod.get_lod(lod)
+        self.lod = lod
+
+    def set_odom_rate(self, odom_rate):
+        # Odometry (ground truth) rate bound in Hz, None keeps the model rate
+        if odom_rate is not None and not float(odom_rate) > 0:
+            raise RuntimeError(f'Invalid odometry rate {odom_rate}, must be positive')
+        self.odom_rate = float(odom_rate) if odom_rate is not None else None
+
+    def generate(self, use_cache=True, flatten=False, output_dir=None, filename=None):
+        # Generate SDF by populating JINJA templates in-process
+        # If use_cache, rendered SDFs are reused from the on-disk cache
+        # If flatten, model:// includes are expanded into a single self-contained SDF
+        # SDFs are written to output_dir, default_output_dir() if not given, cached ones
+        # too so simulation instances sharing the cache never spawn each other's files
+        # filename defaults to {model_type}_{n}.sdf, the config order naming of the scripts
+
+        # Template looked up in the resource path, falls back to the installed models
+        package_dir = package_share_directory()
+        jinja_script = os.path.join(package_dir, 'scripts')
+        template = ign_assets.resources.default_index().find_template(self.model_type)
+        if template is None:
+            template = f'{package_dir}/models/{self.model_type}/{self.model_type}.sdf.jinja'
+        model_dir = os.path.dirname(os.path.dirname(template))
+        output_dir = output_dir or default_output_dir()
+        model_sdf = os.path.join(output_dir, filename or f'{self.model_type}_{self.n}.sdf')
+        sensors = ign_assets.render.payload_sensors(self.payload)
+
+        # Equivalent jinja_gen.py invocation, kept for debugging purposes
+        payload = ' '.join(f"{s['name']} {s['model']} {s['pose']}" for s in sensors)
+        command = ['python3', f'{jinja_script}/jinja_gen.py', template, \
             f'{model_dir}/..', '--namespace', f'{self.model_name}', '--sensors', f'{payload}', \
-            '--battery', f'{self.flight_time}', '--output-file', f'/tmp/{self.model_type}_{self.n}.sdf']
-
-        process = subprocess.Popen(command,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
+            '--battery', f'{self.flight_time}', '--output-file', model_sdf]
+        sensor_params = ign_assets.render.sensor_params(sensors)
+        if sensor_params:
+            command.extend(['--sensor-params', json.dumps(sensor_params)])
+        if self.fidelity:
+            command.extend(['--fidelity', self.fidelity])
+        if flatten:
+            command.append('--flatten')
+        if self.lod:
+            command.extend(['--lod', self.lod])
+        if self.odom_rate:
+            command.extend(['--odom-rate', str(self.odom_rate)])
+        if use_cache:
+            command.append('--cache')
+
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            if use_cache:
+                ign_assets.cache.default_cache().render(
+                    template, f'{model_dir}/..', self.model_name, sensors, battery=self.flight_time,
+                    fidelity=self.fidelity, flatten=flatten, lod=self.lod,
+                    odom_rate=self.odom_rate, output_file=model_sdf)
+            else:
+                result = ign_assets.render.render(template, f'{model_dir}/..', self.model_name,
+                                                  sensors, battery=self.flight_time,
+                                                  fidelity=self.fidelity, flatten=flatten,
+                                                  lod=self.lod, odom_rate=self.odom_rate)
+                ign_assets.render.write_sdf(result, model_sdf, template)
+        except jinja2.UndefinedError as e:
+            raise RuntimeError(f'{template}: {e}') from e
 
-        # evaluate error output to see if there were undefined variables
-        # for the JINJA process
-        stderr = process.communicate()[1]
-        err_output = codecs.getdecoder('unicode_escape')(stderr)[0]
-        for line in err_output.splitlines():
-            if line.find('undefined local') > 0:
-                raise RuntimeError(line)
-
-        model_sdf = f"/tmp/{self.model_type}_{self.n}.sdf"
         return command, model_sdf
 
-    def spawn_args(self, world_name, model_sdf=None):
+    def spawn_args(self, world_name, model_sdf=None, flatten=False, output_dir=None):
         if not model_sdf:
-            [command, model_sdf] = self.generate()
+            [command, model_sdf] = self.generate(flatten=flatten, output_dir=output_dir)
 
         return ['-world', world_name,
                 '-file', model_sdf,
@@ -289,6 +405,37 @@ class Model:
             config = json.load(stream)
             return cls._FromConfigListJson(config)
 
+    @classmethod
+    def IterConfig(cls, stream):
+        # Lazily generate Model instances from a stream, one config entry parsed at a time
+        n = 0
+        config = {}
+        for key, entry in ign_assets.stream.iter_members(stream):
+            if key is None:
+                yield cls._FromConfigDict(entry)
+            elif key == 'drones':
+                yield cls._FromConfigDictJson(entry, n)
+                n += 1
+            else:
+                config[key] = entry
+
+        # Single model yaml configuration
+        if n == 0 and 'model_name' in config:
+            yield cls._FromConfigDict(config)
+
+    @classmethod
+    def FindInConfig(cls, stream, name):
+        # Get a single Model instance by name without building the other ones
+        n = 0
+        for key, entry in ign_assets.stream.iter_members(stream):
+            if key is None and entry.get('model_name') == name:
+                return cls._FromConfigDict(entry)
+            elif key == 'drones':
+                if entry.get('name') == name:
+                    return cls._FromConfigDictJson(entry, n)
+                n += 1
+        return None
+
     @classmethod
     def _FromConfigList(cls, entries):
         # Parse an array of configurations
@@ -332,6 +479,15 @@ class Model:
         if 'gripper' in config:
             model.set_gripper(config['gripper'])
 
+        if 'fidelity' in config:
+            model.set_fidelity(config['fidelity'])
+
+        if 'lod' in config:
+            model.set_lod(config['lod'])
+
+        if 'odom_rate' in config:
+            model.set_odom_rate(config['odom_rate'])
+
         return model
 
     @classmethod
@@ -355,4 +511,13 @@ class Model:
         if 'payload' in config:
             model.set_payload(config['payload'])
 
+        if 'fidelity' in config:
+            model.set_fidelity(config['fidelity'])
+
+        if 'lod' in config:
+            model.set_lod(config['lod'])
+
+        if 'odom_rate' in config:
+            model.set_odom_rate(config['odom_rate'])
+
         return model
\ No newline at end of file
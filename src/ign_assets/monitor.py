@@ -0,0 +1,86 @@
+import os
+import select
+import subprocess
+import time
+
+
+READY_MSG = 'Simulation ready'
+
+# Seconds given to the server to load a world, large worlds take a while
+WORLD_TIMEOUT = 120.0
+
+# Gazebo transport partition variables, fortress reads IGN_ and later releases GZ_
+PARTITION_ENVS = ['IGN_PARTITION', 'GZ_PARTITION']
+
+
+def current_partition():
+    for env in PARTITION_ENVS:
+        if os.getenv(env):
+            return os.getenv(env)
+    return None
+
+
+def process_partition(pid):
+    # Transport partition a process was started with, None if not set
+    with open(f'/proc/{pid}/environ', 'rb') as f:
+        environ = f.read().split(b'\0')
+    for env in PARTITION_ENVS:
+        prefix = f'{env}='.encode()
+        for variable in environ:
+            if variable.startswith(prefix) and len(variable) > len(prefix):
+                return variable[len(prefix):].decode(errors='ignore')
+    return None
+
+
+def find_server_pid(pattern='gazebo', partition=None):
+    # Scan /proc once for a process whose command line contains pattern
+    # Only servers of the given partition match, defaults to the current one,
+    # so side by side simulation instances never pick each other's server
+    partition = partition or current_partition()
+    own_pid = os.getpid()
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit() or int(entry) == own_pid:
+            continue
+        try:
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='ignore')
+            if pattern not in cmdline or 'monitor_sim' in cmdline:
+                continue
+            if partition and process_partition(entry) != partition:
+                continue
+        except OSError:
+            continue
+        return int(entry)
+    return None
+
+
+def wait_for_exit(pid):
+    # Block until process exits, without polling when pidfd is available (Linux >= 5.3)
+    try:
+        fd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return
+    except (AttributeError, OSError):
+        # No pidfd support, fall back to watching /proc
+        while os.path.exists(f'/proc/{pid}'):
+            time.sleep(0.1)
+        return
+
+    try:
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        poller.poll()
+    finally:
+        os.close(fd)
+
+
+def wait_for_world(world_name, timeout=WORLD_TIMEOUT):
+    # Block until the world publishes its first stats message, which means it is loaded
+    # False if it is not loaded within timeout seconds (never times out if None)
+    try:
+        subprocess.run(['ign', 'topic', '-e', '-t', f'/world/{world_name}/stats', '-n', '1'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       timeout=timeout, check=True)
+    except (OSError, subprocess.TimeoutExpired, subprocess.CalledProcessError):
+        return False
+    return True
@@ -0,0 +1,165 @@
+import functools
+import os
+import shutil
+import tempfile
+
+import jinja2
+
+import ign_assets.fidelity
+import ign_assets.flatten
+import ign_assets.lod
+
+
+# Stands for the drone namespace in rendered bodies shared by identical drones,
+# a valid XML name and topic segment
+NAMESPACE_PLACEHOLDER = '__ign_assets_namespace__'
+
+
+def get_file_contents(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=None)
+def get_environment(env_dir):
+    # One environment per template root, shared by the whole process.
+    # Compiled templates are cached by the environment and only recompiled
+    # when the template file changes on disk.
+    return jinja2.Environment(loader=jinja2.FileSystemLoader(env_dir),
+                              undefined=jinja2.StrictUndefined)
+
+
+def get_template(filename, env_dir):
+    env = get_environment(os.path.abspath(env_dir))
+    return env.get_template(os.path.relpath(filename, env_dir))
+
+
+@functools.lru_cache(maxsize=64)
+def _uses_base_sdf(filename, mtime_ns):
+    with open(filename, 'r') as f:
+        return 'base_sdf' in f.read()
+
+
+def uses_base_sdf(filename):
+    # Whether the template includes its platform base model through base_sdf, templates
+    # declaring the whole platform inline (crazyflie) have no base sensors to bound
+    return _uses_base_sdf(filename, os.stat(filename).st_mtime_ns)
+
+
+def get_sensors(sensors_array, sensor_params=None):
+    # Parse a flat list of 'name model x y z roll pitch yaw' groups
+    # sensor_params optionally maps sensor names to fidelity override dicts
+    sensor_params = sensor_params or {}
+    sensors = []
+    while sensors_array and sensors_array[0]:
+        name = sensors_array.pop(0)
+        model = sensors_array.pop(0)
+        pose, sensors_array = sensors_array[:6], sensors_array[6:]
+
+        sensor = {'name': name, 'model': model,
+                  'pose': f'{pose[0]} {pose[1]} {pose[2]} {pose[3]} {pose[4]} {pose[5]}'}
+        params = ign_assets.fidelity.sensor_params(sensor_params.get(name, {}))
+        if params:
+            sensor['params'] = params
+        sensors.append(sensor)
+    return sensors
+
+
+def payload_sensors(payload):
+    # Build the template sensor list from a model payload dictionary
+    sensors = []
+    for sensor_name, sensor in payload.items():
+        if 'sensor' not in sensor:
+            continue
+
+        x_s, y_s, z_s = 0, 0, 0
+        if 'xyz' in sensor:
+            x_s, y_s, z_s = sensor['xyz']
+
+        roll_s, pitch_s, yaw_s = 0, 0, 0
+        if 'rpy' in sensor:
+            roll_s, pitch_s, yaw_s = sensor['rpy']
+
+        entry = {'name': sensor_name, 'model': sensor['sensor'],
+                 'pose': f'{x_s} {y_s} {z_s} {roll_s} {pitch_s} {yaw_s}'}
+        params = ign_assets.fidelity.sensor_params(sensor)
+        if params:
+            entry['params'] = params
+        sensors.append(entry)
+    return sensors
+
+
+def sensor_params(sensors):
+    # Fidelity overrides by sensor name, as taken by jinja_gen.py --sensor-params
+    return {sensor['name']: sensor['params'] for sensor in sensors if 'params' in sensor}
+
+
+def render(filename, env_dir, namespace, sensors=None, odom=True, battery=0.0, fidelity=None,
+           flatten=False, lod=None, odom_rate=None):
+    # Render a model template, raises jinja2.UndefinedError on undefined variables
+    # odom_rate bounds the odometry publisher rate, as the fidelity profile does
+    # If flatten, model:// includes are expanded into a single self-contained SDF
+    # lod selects decimated meshes and collision proxies, included meshes are only
+    # reachable once flattened so it implies flatten
+    template = get_template(filename, env_dir)
+    profile = ign_assets.fidelity.get_profile(fidelity)
+    flatten = flatten or bool(ign_assets.lod.get_lod(lod))
+
+    # Sensors with fidelity overrides or bounds are rendered inline instead of included
+    models_dir = os.path.dirname(os.path.dirname(os.path.abspath(filename)))
+    sensors = [dict(sensor, sdf=ign_assets.fidelity.model_sdf(
+                        models_dir, sensor['model'], sensor.get('params'), fidelity))
+               if sensor.get('params') or profile else sensor for sensor in sensors or []]
+
+    d = {'namespace': namespace, 'sensors': sensors, 'odom_plugin': odom,
+         'battery_plugin': bool(float(battery)), 'capacity': float(battery)}
+
+    if profile:
+        # Platform base model, included by the template with its internal sensors
+        base_model = os.path.basename(os.path.dirname(os.path.abspath(filename)))
+        if uses_base_sdf(filename) and \
+                os.path.exists(os.path.join(models_dir, base_model, 'model.config')):
+            d['base_sdf'] = ign_assets.fidelity.model_sdf(models_dir, base_model,
+                                                          fidelity=fidelity, merge=True)
+        if 'odometry' in profile:
+            d['max_odom_rate'] = profile['odometry']['update_rate']
+    if odom_rate:
+        d['max_odom_rate'] = min(d.get('max_odom_rate', odom_rate), odom_rate)
+
+    result = template.render(d)
+    if flatten:
+        result = ign_assets.flatten.flatten(result, models_dir, lod)
+    return result
+
+
+def instantiate(body, namespace):
+    # SDF of one drone from a body rendered with NAMESPACE_PLACEHOLDER
+    return body.replace(NAMESPACE_PLACEHOLDER, namespace)
+
+
+def write_sdf(result, filename_out, filename):
+    # Overwrite protection mechanism: after generation, the file will be copied to a "last_generated" file.
+    # In the next run, we can check whether the target file is still unmodified.
+    filename_out_last_generated = filename_out + '.last_generated'
+
+    if os.path.exists(filename_out) and os.path.exists(filename_out_last_generated):
+        # Check whether the target file is still unmodified.
+        if get_file_contents(filename_out).strip() != get_file_contents(filename_out_last_generated).strip():
+            raise Exception("ERROR: generation would overwrite changes to `{}`. ".format(filename_out) +
+                            "Changes should only be made to the template file `{}`. ".format(filename) +
+                            "Remove `{}` ".format(os.path.basename(filename_out)) +
+                            "(after extracting your changes) to disable this overwrite protection.")
+
+    # Replace the file instead of writing into it, an existing link (e.g. to a cache entry)
+    # is replaced and never written through
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename_out)),
+                                    suffix='.tmp')
+    with os.fdopen(fd, 'w') as f_out:
+        f_out.write(result)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, filename_out)
+
+    # Copy the contents to a "last_generated" file for overwrite protection check next time.
+    if os.path.islink(filename_out_last_generated):
+        os.remove(filename_out_last_generated)
+    shutil.copy(filename_out, filename_out_last_generated)
@@ -0,0 +1,124 @@
+import functools
+import json
+import os
+import tempfile
+
+
+RESOURCE_PATH_ENVS = ['IGN_GAZEBO_RESOURCE_PATH', 'GZ_SIM_RESOURCE_PATH']
+INDEX_VERSION = 1
+
+
+def resource_paths():
+    # Resource path entries in lookup order, without duplicates or stray \r
+    paths = []
+    for env in RESOURCE_PATH_ENVS:
+        for path in os.getenv(env, '').split(':'):
+            path = path.strip().rstrip('\r')
+            if path and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def default_index_file():
+    # Same location as the SDF cache (see ign_assets.cache), without importing the renderer
+    if 'IGN_ASSETS_CACHE_DIR' in os.environ:
+        return os.path.join(os.environ['IGN_ASSETS_CACHE_DIR'], 'resource_index.json')
+    cache_home = os.getenv('XDG_CACHE_HOME', default=os.path.expanduser('~/.cache'))
+    return os.path.join(cache_home, 'ignition_assets', 'resource_index.json')
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scan(paths):
+    # Index models, worlds and templates of every resource path, first entry wins
+    index = {'models': {}, 'worlds': {}, 'templates': {}}
+    mtimes = {}
+    for path in paths:
+        mtimes[path] = _mtime(path)
+        if mtimes[path] is None:
+            continue
+        with os.scandir(path) as it:
+            for entry in sorted(it, key=lambda e: e.name):
+                if entry.is_dir():
+                    if not os.path.exists(os.path.join(entry.path, 'model.config')):
+                        continue
+                    # Model contents changes (e.g. a new template) change its mtime
+                    mtimes[entry.path] = _mtime(entry.path)
+                    index['models'].setdefault(entry.name, entry.path)
+                    template = os.path.join(entry.path, f'{entry.name}.sdf.jinja')
+                    if os.path.exists(template):
+                        index['templates'].setdefault(entry.name, template)
+                elif entry.name.endswith('.sdf'):
+                    index['worlds'].setdefault(entry.name[:-len('.sdf')], entry.path)
+    return index, mtimes
+
+
+class ResourceIndex:
+    """
+    Model, world and template lookup over the resource path.
+
+    The resource path is scanned once and the index is kept on disk,
+    it is rebuilt when the resource path or any indexed directory changes.
+    """
+
+    def __init__(self, paths=None, index_file=None):
+        self.paths = resource_paths() if paths is None else list(paths)
+        self.index_file = index_file or default_index_file()
+        self.index = self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                cached = json.load(f)
+            if cached['version'] == INDEX_VERSION and cached['paths'] == self.paths and \
+                    all(_mtime(path) == mtime for path, mtime in cached['mtimes'].items()):
+                return cached['index']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index, mtimes = _scan(self.paths)
+        self._save({'version': INDEX_VERSION, 'paths': self.paths, 'mtimes': mtimes,
+                    'index': index})
+        return index
+
+    def _save(self, content):
+        dirname = os.path.dirname(self.index_file)
+        try:
+            os.makedirs(dirname, exist_ok=True)
+            # Write to a temporary file first so concurrent readers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(content, f)
+            os.replace(tmp_path, self.index_file)
+        except OSError:
+            # Read-only cache, the index is only kept in memory
+            pass
+
+    def find_model(self, name):
+        # Model directory, None if not found
+        return self.index['models'].get(name)
+
+    def find_world(self, name):
+        # World SDF file, None if not found
+        if name.endswith('.sdf'):
+            name = name[:-len('.sdf')]
+        return self.index['worlds'].get(name)
+
+    def find_template(self, name):
+        # Model JINJA template, None if not found
+        return self.index['templates'].get(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _default_index(paths):
+    return ResourceIndex(paths)
+
+
+def default_index():
+    # Process wide index of the current resource path
+    return _default_index(tuple(resource_paths()))
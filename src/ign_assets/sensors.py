@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+
+import ign_assets.bridges
+
+
+ENTRY_POINT_GROUP = 'ign_assets.sensors'
+
+
+@dataclass(frozen=True)
+class CustomBridge:
+    # ignition_assets custom bridge node, run as executable or loaded as plugin component.
+    # parameters(world_name, model_name, sensor_name, sensor_type) -> dict
+    executable: str
+    plugin: str
+    parameters: object
+
+
+@dataclass(frozen=True)
+class SensorType:
+    """
+    Bridges of a sensor model.
+
+    Bridge factories are called as
+    factory(world_name, model_name, sensor_name, sensor_type, model_prefix)
+    and return one ign_assets.bridge.Bridge each.
+    """
+
+    family: str
+    bridges: tuple = ()
+    custom_bridges: tuple = ()
+
+
+def _gripper(factory, *args):
+    # Gripper bridges only depend on the model name
+    return lambda world_name, model_name, sensor_name, sensor_type, model_prefix: \
+        factory(model_name, *args)
+
+
+def _gps_parameters(world_name, model_name, sensor_name, sensor_type):
+    return {'world_name': world_name,
+            'name_space': model_name,
+            'sensor_name': sensor_name,
+            'link_name': sensor_type,
+            'sensor_type': 'navsat'}
+
+
+# Bridges of each sensor family
+FAMILIES = {
+    'camera': SensorType('camera', bridges=(
+        ign_assets.bridges.image,
+        ign_assets.bridges.camera_info)),
+    'lidar': SensorType('lidar', bridges=(
+        ign_assets.bridges.lidar_scan,
+        ign_assets.bridges.lidar_points)),
+    'rgbd': SensorType('rgbd', bridges=(
+        ign_assets.bridges.image,
+        ign_assets.bridges.camera_info,
+        ign_assets.bridges.depth_image,
+        ign_assets.bridges.camera_points)),
+    # navsat bridge not supported in fortress, custom bridge instead
+    'gps': SensorType('gps', custom_bridges=(
+        CustomBridge('gps_bridge', 'GPSBridge', _gps_parameters),)),
+    'suction_gripper': SensorType('suction_gripper', bridges=(
+        _gripper(ign_assets.bridges.gripper_suction_control),
+        _gripper(ign_assets.bridges.gripper_contact, 'center'),
+        _gripper(ign_assets.bridges.gripper_contact, 'left'),
+        _gripper(ign_assets.bridges.gripper_contact, 'right'),
+        _gripper(ign_assets.bridges.gripper_contact, 'top'),
+        _gripper(ign_assets.bridges.gripper_contact, 'bottom'))),
+}
+
+# Sensor models by family
+# TODO: semantic_camera segmentation
+# FIXME: point_lidar scan not working properly
+SENSORS = {
+    'camera': ['vga_camera', 'hd_camera', 'semantic_camera'],
+    'rgbd': ['rgbd_camera'],
+    'lidar': ['planar_lidar', 'lidar_3d', 'point_lidar'],
+    'gps': ['gps'],
+    'suction_gripper': ['suction_gripper'],
+}
+
+
+class SensorRegistry:
+    """
+    Sensor model name to SensorType lookup.
+
+    Built from the SENSORS table, extended by the 'ign_assets.sensors' entry
+    point group: each entry point is named after a sensor model and loads
+    a SensorType.
+    """
+
+    def __init__(self):
+        self._sensors = {}
+
+    def __contains__(self, model):
+        return model in self._sensors
+
+    def get(self, model):
+        return self._sensors.get(model)
+
+    def register(self, model, sensor_type):
+        self._sensors[model] = sensor_type
+
+    def models(self, family):
+        return [model for model, sensor_type in self._sensors.items()
+                if sensor_type.family == family]
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        for entry_point in entry_points(group=group):
+            try:
+                sensor_type = entry_point.load()
+            except Exception as e:
+                print(f'Failed to load sensor {entry_point.name} from {entry_point.value}: {e}')
+                continue
+            if not isinstance(sensor_type, SensorType):
+                print(f'Sensor {entry_point.name} from {entry_point.value} is not a SensorType')
+                continue
+            self.register(entry_point.name, sensor_type)
+
+    @classmethod
+    def FromTable(cls, sensors, families):
+        registry = cls()
+        for family, models in sensors.items():
+            for model in models:
+                registry.register(model, families[family])
+        return registry
+
+
+registry = SensorRegistry.FromTable(SENSORS, FAMILIES)
+registry.load_entry_points()
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import math
+
+import ign_assets.cache
+
+
+# Bytes of a single create_multiple request, under the Linux limit of one argv string
+# (MAX_ARG_STRLEN, 128 KiB) since requests are passed to ign service as --req
+MAX_REQUEST_SIZE = 120 * 1024
+
+
+def generate_models(models, max_workers=None, flatten=False, output_dir=None):
+    # Render every model SDF on a worker pool, returns SDF paths in model order
+    def generate(model):
+        return model.generate(flatten=flatten, output_dir=output_dir)[1]
+
+    if len(models) <= 1:
+        model_sdfs = [generate(model) for model in models]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            model_sdfs = list(executor.map(generate, models))
+
+    # Once per batch, entries of this batch are kept
+    ign_assets.cache.default_cache().evict()
+    return model_sdfs
+
+
+def quaternion_from_euler(roll, pitch, yaw):
+    cr, sr = math.cos(roll / 2), math.sin(roll / 2)
+    cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
+    cy, sy = math.cos(yaw / 2), math.sin(yaw / 2)
+    return (sr * cp * cy - cr * sp * sy,
+            cr * sp * cy + sr * cp * sy,
+            cr * cp * sy - sr * sp * cy,
+            cr * cp * cy + sr * sp * sy)
+
+
+def euler_from_quaternion(x, y, z, w):
+    roll = math.atan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    pitch = math.asin(max(-1.0, min(1.0, 2 * (w * y - z * x))))
+    yaw = math.atan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return roll, pitch, yaw
+
+
+def entity_factory(model, model_sdf):
+    # ignition.msgs.EntityFactory in protobuf text format
+    x, y, z, roll, pitch, yaw = [float(v) for v in model.position]
+    qx, qy, qz, qw = quaternion_from_euler(roll, pitch, yaw)
+    return (f'{{sdf_filename: {json.dumps(model_sdf)}, name: {json.dumps(model.model_name)}, '
+            f'allow_renaming: false, '
+            f'pose: {{position: {{x: {x}, y: {y}, z: {z}}}, '
+            f'orientation: {{x: {qx}, y: {qy}, z: {qz}, w: {qw}}}}}}}')
+
+
+def create_multiple_request(models, model_sdfs):
+    # ignition.msgs.EntityFactory_V in protobuf text format
+    return ' '.join(f'data: {entity_factory(model, model_sdf)}'
+                    for model, model_sdf in zip(models, model_sdfs))
+
+
+def create_multiple_requests(models, model_sdfs, max_size=MAX_REQUEST_SIZE):
+    # create_multiple requests of every model, split so none exceeds max_size bytes
+    requests = []
+    entries = []
+    size = 0
+    for model, model_sdf in zip(models, model_sdfs):
+        entry = f'data: {entity_factory(model, model_sdf)}'
+        entry_size = len(entry.encode()) + 1
+        if entries and size + entry_size > max_size:
+            requests.append(' '.join(entries))
+            entries, size = [], 0
+        entries.append(entry)
+        size += entry_size
+    if entries:
+        requests.append(' '.join(entries))
+    return requests
+
+
+def create_multiple_service(world_name):
+    return f'/world/{world_name}/create_multiple'
+
+
+def remove_service(world_name):
+    return f'/world/{world_name}/remove'
+
+
+def remove_cmd(world_name, model_name, timeout=5000):
+    # Remove a model from a running world by name
+    return ['ign', 'service',
+            '-s', remove_service(world_name),
+            '--reqtype', 'ignition.msgs.Entity',
+            '--reptype', 'ignition.msgs.Boolean',
+            '--timeout', str(timeout),
+            '--req', f'name: {json.dumps(model_name)}, type: MODEL']
+
+
+def create_multiple_cmd(world_name, models, model_sdfs, timeout=60000, request=None):
+    # Single world edit request that spawns every model at once
+    return ['ign', 'service',
+            '-s', create_multiple_service(world_name),
+            '--reqtype', 'ignition.msgs.EntityFactory_V',
+            '--reptype', 'ignition.msgs.Boolean',
+            '--timeout', str(timeout),
+            '--req', request or create_multiple_request(models, model_sdfs)]
+
+
+def create_multiple_cmds(world_name, models, model_sdfs, timeout=60000):
+    # World edit requests that spawn every model, as few as the argv size limit allows
+    return [create_multiple_cmd(world_name, None, None, timeout, request)
+            for request in create_multiple_requests(models, model_sdfs)]
+
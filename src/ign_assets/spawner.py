@@ -0,0 +1,115 @@
+import json
+import os
+import signal
+import subprocess
+import threading
+
+import ign_assets.spawn
+from ign_assets.model import Model, default_output_dir
+
+
+class Spawner:
+    """
+    Add and remove drones of a running world.
+
+    Drones are described as config file drone entries, rendered in process,
+    spawned through the world create service and bridged by their own
+    model_bridges.py launch, which is stopped again when the drone is removed.
+    """
+
+    def __init__(self, world_name, flatten=False, output_dir=None, bridges=True, timeout=10.0,
+                 tf_aggregation=False, odom_rate=None, fidelity=None, lod=None):
+        self.world_name = world_name
+        self.flatten = flatten
+        self.output_dir = output_dir or default_output_dir()
+        self.bridges = bridges
+        # Poses bridged by the world tf_aggregator, not by the drone bridges
+        self.tf_aggregation = tf_aggregation
+        # Settings of drones without their own, as the launch config applies them
+        # (see SimulationConfig.odom_rate, fidelity and lod)
+        self.odom_rate = odom_rate
+        self.fidelity = fidelity
+        self.lod = lod
+        self.timeout = timeout
+        self.drones = {}
+        self._lock = threading.Lock()
+
+    def _call(self, cmd):
+        # ign service request, the reply is an ignition.msgs.Boolean
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=self.timeout + 1.0)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise RuntimeError(f'{cmd[3]} request failed: {e}') from e
+        if 'data: true' not in result.stdout.decode():
+            output = (result.stdout + result.stderr).decode().strip()
+            raise RuntimeError(f'{cmd[3]} request failed: {output or "no reply"}')
+
+    def spawn(self, entry):
+        # Spawn a drone from its config entry and start its bridges, returns its model
+        with self._lock:
+            if entry.get('name') in self.drones:
+                raise RuntimeError(f"Drone {entry['name']} already spawned")
+            defaults = {'odom_rate': self.odom_rate, 'fidelity': self.fidelity, 'lod': self.lod}
+            entry = dict({k: v for k, v in defaults.items() if v}, **entry)
+            model = Model._FromConfigDictJson(entry)
+            self.drones[model.model_name] = None
+
+        try:
+            # Named after the drone, apart from the {model_type}_{n}.sdf files of config drones
+            _, model_sdf = model.generate(flatten=self.flatten,
+                                          output_dir=os.path.join(self.output_dir, 'spawned'),
+                                          filename=f'{model.model_name}.sdf')
+            self._call(ign_assets.spawn.create_multiple_cmd(
+                self.world_name, [model], [model_sdf], timeout=int(self.timeout * 1000)))
+            process = self._start_bridges(entry, model) if self.bridges else None
+        except Exception:
+            with self._lock:
+                del self.drones[model.model_name]
+            raise
+
+        with self._lock:
+            self.drones[model.model_name] = (model, process)
+        return model
+
+    def _start_bridges(self, entry, model):
+        # One drone config, so model_bridges.py bridges exactly this drone
+        config_file = os.path.join(self.output_dir, f'{model.model_name}.json')
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(config_file, 'w') as f:
+            json.dump({'world': self.world_name, 'tf_aggregation': self.tf_aggregation,
+                       'drones': [entry]}, f)
+        # Own session, so the launch and every bridge it started are stopped together
+        return subprocess.Popen(['ros2', 'launch', 'ignition_assets', 'model_bridges.py',
+                                 f'config_file:={config_file}', f'drone_id:={model.model_name}'],
+                                start_new_session=True)
+
+    @staticmethod
+    def _stop(process, grace=5.0):
+        if process is None or process.poll() is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGINT)
+            process.wait(grace)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+        except ProcessLookupError:
+            pass
+
+    def remove(self, name):
+        # Stop the drone bridges and remove it from the world
+        with self._lock:
+            if not self.drones.get(name):
+                raise RuntimeError(f'Drone {name} not spawned')
+            _, process = self.drones.pop(name)
+        self._stop(process)
+        self._call(ign_assets.spawn.remove_cmd(self.world_name, name,
+                                               timeout=int(self.timeout * 1000)))
+
+    def shutdown(self):
+        # Stop every bridge, drones are left in the world
+        with self._lock:
+            drones, self.drones = self.drones, {}
+        for drone in drones.values():
+            if drone:
+                self._stop(drone[1])
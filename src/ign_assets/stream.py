@@ -0,0 +1,137 @@
+import json
+
+import yaml
+
+
+class _JsonReader:
+    """Incremental JSON reader, keeps only the unparsed tail of the stream in memory."""
+
+    def __init__(self, stream, chunk_size=65536):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        # Next non whitespace character, empty string at end of stream
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self.fill()
+
+    def expect(self, chars):
+        c = self.peek()
+        if c not in chars:
+            raise ValueError(f'Expecting one of {chars!r}, found {c!r}')
+        self.pos += 1
+        return c
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+                continue
+            # A number ending at the buffer end may continue in the next chunk
+            if end == len(self.buf) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return obj
+
+    def items(self):
+        # Iterate over array items, the opening bracket must be already consumed
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def _iter_json(stream, array_key):
+    reader = _JsonReader(stream)
+    if reader.peek() == '[':
+        reader.pos += 1
+        for item in reader.items():
+            yield None, item
+        return
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == array_key and reader.peek() == '[':
+            reader.pos += 1
+            for item in reader.items():
+                yield key, item
+        else:
+            yield key, reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+
+def _iter_yaml(stream, array_key):
+    loader = yaml.SafeLoader(stream)
+
+    def construct():
+        return loader.construct_document(loader.compose_node(None, None))
+
+    def items():
+        loader.get_event()
+        while not loader.check_event(yaml.SequenceEndEvent):
+            yield construct()
+        loader.get_event()
+
+    try:
+        loader.get_event()
+        if loader.check_event(yaml.StreamEndEvent):
+            return
+        loader.get_event()
+        if loader.check_event(yaml.SequenceStartEvent):
+            for item in items():
+                yield None, item
+        elif loader.check_event(yaml.MappingStartEvent):
+            loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = construct()
+                if key == array_key and loader.check_event(yaml.SequenceStartEvent):
+                    for item in items():
+                        yield key, item
+                else:
+                    yield key, construct()
+    finally:
+        loader.dispose()
+
+
+def iter_members(stream, array_key='drones'):
+    """
+    Stream the top level members of a JSON or YAML config.
+
+    Yields (key, value) pairs. Items of the array_key list are yielded one
+    at a time as (array_key, item), and items of a top level list as
+    (None, item), so only one entry is held in memory at a time.
+    """
+    file_extension = stream.name.split('.')[-1]
+    if file_extension in ['yaml', 'yml']:
+        yield from _iter_yaml(stream, array_key)
+    else:
+        yield from _iter_json(stream, array_key)
@@ -0,0 +1,28 @@
+#ifndef IGNITION_ASSETS_IGNITION_NODE_HPP_
+#define IGNITION_ASSETS_IGNITION_NODE_HPP_
+
+#include <memory>
+
+#include <ignition/transport.hh>
+
+namespace ignition_assets {
+
+// Ignition transport node of a bridge component. Its callbacks run on ignition threads
+// until the node is destroyed, so it must go before the members they use: declare it
+// as the last member of the component, members are destroyed in reverse order.
+// stop() ends the callbacks earlier, e.g. to flush state in the destructor.
+class IgnitionNode {
+public:
+  IgnitionNode() : node_(std::make_unique<ignition::transport::Node>()) {}
+
+  ignition::transport::Node *operator->() const { return node_.get(); }
+
+  void stop() { node_.reset(); }
+
+private:
+  std::unique_ptr<ignition::transport::Node> node_;
+};
+
+}  // namespace ignition_assets
+
+#endif  // IGNITION_ASSETS_IGNITION_NODE_HPP_
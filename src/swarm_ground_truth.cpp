@@ -0,0 +1,209 @@
+#include <chrono>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <regex>
+#include <set>
+#include <string>
+#include <vector>
+
+#include "rclcpp/publisher.hpp"
+#include "rclcpp/rclcpp.hpp"
+#include "rclcpp_components/register_node_macro.hpp"
+
+#include "geometry_msgs/msg/transform.hpp"
+#include "geometry_msgs/msg/twist.hpp"
+#include "sensor_msgs/msg/multi_dof_joint_state.hpp"
+
+#include <ignition/msgs.hh>
+#include <ignition/transport.hh>
+
+#include "ignition_node.hpp"
+
+namespace ignition_assets {
+
+// Swarm ground truth: the latest odometry of every model packed into a single
+// MultiDOFJointState (joint_names are model names, transforms their poses and twist
+// their body twists, as the per drone ground_truth_bridge), published at most at
+// rate Hz of simulation time, or on every tick with new odometry if rate is 0.
+class SwarmGroundTruth : public rclcpp::Node {
+public:
+  explicit SwarmGroundTruth(const rclcpp::NodeOptions &options = rclcpp::NodeOptions())
+      : Node("swarm_ground_truth", options) {
+    this->declare_parameter<std::string>("world_name");
+    this->get_parameter("world_name", world_name_);
+
+    // Models to include, every model publishing odometry if empty
+    this->declare_parameter<std::vector<std::string>>("model_names", std::vector<std::string>());
+    std::vector<std::string> model_names;
+    this->get_parameter("model_names", model_names);
+    model_names_ = std::set<std::string>(model_names.begin(), model_names.end());
+
+    this->declare_parameter<double>("rate", 0.0);
+    this->get_parameter("rate", rate_);
+
+    this->declare_parameter<std::string>("frame_id", "earth");
+    this->get_parameter("frame_id", frame_id_);
+
+    this->declare_parameter<std::string>("topic", "swarm/ground_truth");
+    std::string topic;
+    this->get_parameter("topic", topic);
+
+    this->declare_parameter<double>("discovery_period", 1.0);
+    double discovery_period;
+    this->get_parameter("discovery_period", discovery_period);
+
+    pub_ = this->create_publisher<sensor_msgs::msg::MultiDOFJointState>(topic,
+                                                                       rclcpp::SensorDataQoS());
+
+    // Initialize the ignition node, one clock message per simulation tick
+    std::string clock_topic = "/world/" + world_name_ + "/clock";
+    ign_node_->Subscribe(clock_topic, &SwarmGroundTruth::ignitionClockCallback, this);
+
+    // Models are spawned and removed at runtime, their odometry topics are looked up periodically
+    discoverTopics();
+    discovery_timer_ = this->create_wall_timer(
+        std::chrono::duration<double>(discovery_period),
+        std::bind(&SwarmGroundTruth::discoverTopics, this));
+  }
+
+private:
+  struct State {
+    geometry_msgs::msg::Transform transform;
+    geometry_msgs::msg::Twist twist;
+  };
+
+  std::string world_name_;
+  std::set<std::string> model_names_;
+  double rate_;
+  std::string frame_id_;
+  rclcpp::Publisher<sensor_msgs::msg::MultiDOFJointState>::SharedPtr pub_;
+  rclcpp::TimerBase::SharedPtr discovery_timer_;
+
+  std::mutex mutex_;
+  // Odometry topic of each model
+  std::map<std::string, std::string> topics_;
+  // Latest state of each model, in name order
+  std::map<std::string, State> states_;
+  bool updated_     = false;
+  double next_time_ = 0.0;
+  double last_time_ = 0.0;
+
+  // Last member, destroyed first (see IgnitionNode)
+  IgnitionNode ign_node_;
+
+private:
+  void discoverTopics() {
+    static const std::regex odometry_topic("^/model/([^/]+)/odometry$");
+
+    std::vector<std::string> topics;
+    ign_node_->TopicList(topics);
+
+    std::map<std::string, std::string> found;
+    for (const auto &topic : topics) {
+      std::smatch match;
+      if (!std::regex_match(topic, match, odometry_topic)) {
+        continue;
+      }
+      if (!model_names_.empty() && model_names_.count(match[1].str()) == 0) {
+        continue;
+      }
+      found[topic] = match[1].str();
+    }
+
+    // topics_ only changes here, ignition subscriptions are not made under the lock
+    // since odometry callbacks take it
+    for (const auto &topic : found) {
+      if (topics_.count(topic.first) ||
+          !ign_node_->Subscribe(topic.first, &SwarmGroundTruth::ignitionOdometryCallback,
+                                    this)) {
+        continue;
+      }
+      std::lock_guard<std::mutex> lock(mutex_);
+      topics_.insert(topic);
+    }
+
+    std::vector<std::string> removed;
+    for (const auto &topic : topics_) {
+      if (!found.count(topic.first)) {
+        ign_node_->Unsubscribe(topic.first);
+        removed.push_back(topic.first);
+      }
+    }
+
+    std::lock_guard<std::mutex> lock(mutex_);
+    for (const auto &topic : removed) {
+      states_.erase(topics_[topic]);
+      topics_.erase(topic);
+    }
+  }
+
+  void ignitionOdometryCallback(const ignition::msgs::Odometry &ign_msg,
+                                const ignition::transport::MessageInfo &msg_info) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto it = topics_.find(msg_info.Topic());
+    if (it == topics_.end()) {
+      return;
+    }
+
+    State &state                  = states_[it->second];
+    state.transform.translation.x = ign_msg.pose().position().x();
+    state.transform.translation.y = ign_msg.pose().position().y();
+    state.transform.translation.z = ign_msg.pose().position().z();
+    state.transform.rotation.w    = ign_msg.pose().orientation().w();
+    state.transform.rotation.x    = ign_msg.pose().orientation().x();
+    state.transform.rotation.y    = ign_msg.pose().orientation().y();
+    state.transform.rotation.z    = ign_msg.pose().orientation().z();
+    state.twist.linear.x          = ign_msg.twist().linear().x();
+    state.twist.linear.y          = ign_msg.twist().linear().y();
+    state.twist.linear.z          = ign_msg.twist().linear().z();
+    state.twist.angular.x         = ign_msg.twist().angular().x();
+    state.twist.angular.y         = ign_msg.twist().angular().y();
+    state.twist.angular.z         = ign_msg.twist().angular().z();
+    updated_                      = true;
+  }
+
+  void ignitionClockCallback(const ignition::msgs::Clock &ign_msg,
+                             const ignition::transport::MessageInfo &msg_info) {
+    double time = ign_msg.sim().sec() + ign_msg.sim().nsec() * 1e-9;
+
+    sensor_msgs::msg::MultiDOFJointState msg;
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      if (time < last_time_) {
+        // Simulation reset
+        next_time_ = time;
+      }
+      last_time_ = time;
+      if (!updated_ || states_.empty() || time < next_time_) {
+        return;
+      }
+      if (rate_ > 0.0) {
+        // Fixed steps of simulation time, restarted from now after skipped ticks
+        next_time_ += 1.0 / rate_;
+        if (next_time_ <= time) {
+          next_time_ = time + 1.0 / rate_;
+        }
+      }
+      updated_ = false;
+
+      msg.joint_names.reserve(states_.size());
+      msg.transforms.reserve(states_.size());
+      msg.twist.reserve(states_.size());
+      for (const auto &state : states_) {
+        msg.joint_names.push_back(state.first);
+        msg.transforms.push_back(state.second.transform);
+        msg.twist.push_back(state.second.twist);
+      }
+    }
+
+    msg.header.stamp.sec     = ign_msg.sim().sec();
+    msg.header.stamp.nanosec = ign_msg.sim().nsec();
+    msg.header.frame_id      = frame_id_;
+    pub_->publish(msg);
+  }
+};
+
+}  // namespace ignition_assets
+
+RCLCPP_COMPONENTS_REGISTER_NODE(ignition_assets::SwarmGroundTruth)
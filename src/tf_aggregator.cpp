@@ -0,0 +1,205 @@
+#include <algorithm>
+#include <chrono>
+#include <iterator>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <regex>
+#include <set>
+#include <string>
+#include <vector>
+
+#include "rclcpp/publisher.hpp"
+#include "rclcpp/rclcpp.hpp"
+#include "rclcpp_components/register_node_macro.hpp"
+
+#include "geometry_msgs/msg/transform_stamped.hpp"
+#include "tf2_msgs/msg/tf_message.hpp"
+#include <tf2_ros/qos.hpp>
+
+#include <ignition/msgs.hh>
+#include <ignition/transport.hh>
+#include <ros_gz_bridge/convert.hpp>
+
+#include "ignition_node.hpp"
+
+namespace ignition_assets {
+
+// Swarm wide TF: the pose vectors of every model are merged into one /tf message
+// per simulation tick, static poses are latched on /tf_static and only republished
+// when a model adds, changes or loses static frames.
+class TfAggregator : public rclcpp::Node {
+public:
+  explicit TfAggregator(const rclcpp::NodeOptions &options = rclcpp::NodeOptions())
+      : Node("tf_aggregator", options) {
+    this->declare_parameter<std::string>("world_name");
+    this->get_parameter("world_name", world_name_);
+
+    // Models to aggregate, every model publishing poses if empty
+    this->declare_parameter<std::vector<std::string>>("model_names", std::vector<std::string>());
+    std::vector<std::string> model_names;
+    this->get_parameter("model_names", model_names);
+    model_names_ = std::set<std::string>(model_names.begin(), model_names.end());
+
+    this->declare_parameter<double>("discovery_period", 1.0);
+    double discovery_period;
+    this->get_parameter("discovery_period", discovery_period);
+
+    tf_pub_ = this->create_publisher<tf2_msgs::msg::TFMessage>("/tf",
+                                                               tf2_ros::DynamicBroadcasterQoS());
+    tf_static_pub_ = this->create_publisher<tf2_msgs::msg::TFMessage>(
+        "/tf_static", tf2_ros::StaticBroadcasterQoS());
+
+    // Initialize the ignition node, one clock message per simulation tick
+    std::string clock_topic = "/world/" + world_name_ + "/clock";
+    ign_node_->Subscribe(clock_topic, &TfAggregator::ignitionClockCallback, this);
+
+    // Models are spawned and removed at runtime, their pose topics are looked up periodically
+    discoverTopics();
+    discovery_timer_ = this->create_wall_timer(
+        std::chrono::duration<double>(discovery_period),
+        std::bind(&TfAggregator::discoverTopics, this));
+  }
+
+private:
+  std::string world_name_;
+  std::set<std::string> model_names_;
+  rclcpp::Publisher<tf2_msgs::msg::TFMessage>::SharedPtr tf_pub_;
+  rclcpp::Publisher<tf2_msgs::msg::TFMessage>::SharedPtr tf_static_pub_;
+  rclcpp::TimerBase::SharedPtr discovery_timer_;
+
+  std::mutex mutex_;
+  std::set<std::string> topics_;
+  // Latest pose vector of each pose topic since the last tick
+  std::map<std::string, tf2_msgs::msg::TFMessage> pending_;
+  // Static frames of each pose_static topic
+  std::map<std::string, tf2_msgs::msg::TFMessage> static_;
+
+  // Last member, destroyed first (see IgnitionNode)
+  IgnitionNode ign_node_;
+
+private:
+  void discoverTopics() {
+    static const std::regex pose_topic("^/model/([^/]+)/pose(_static)?$");
+
+    std::vector<std::string> topics;
+    ign_node_->TopicList(topics);
+
+    std::set<std::string> found;
+    for (const auto &topic : topics) {
+      std::smatch match;
+      if (!std::regex_match(topic, match, pose_topic)) {
+        continue;
+      }
+      if (!model_names_.empty() && model_names_.count(match[1].str()) == 0) {
+        continue;
+      }
+      found.insert(topic);
+    }
+
+    // topics_ only changes here, ignition subscriptions are not made under the lock
+    // since pose callbacks take it
+    for (const auto &topic : found) {
+      if (topics_.count(topic) ||
+          !ign_node_->Subscribe(topic, &TfAggregator::ignitionPoseCallback, this)) {
+        continue;
+      }
+      std::lock_guard<std::mutex> lock(mutex_);
+      topics_.insert(topic);
+      RCLCPP_INFO(this->get_logger(), "Aggregating %s", topic.c_str());
+    }
+
+    // Removed models, their static frames are dropped
+    std::vector<std::string> removed;
+    std::set_difference(topics_.begin(), topics_.end(), found.begin(), found.end(),
+                        std::back_inserter(removed));
+    for (const auto &topic : removed) {
+      ign_node_->Unsubscribe(topic);
+    }
+
+    std::lock_guard<std::mutex> lock(mutex_);
+    bool static_changed = false;
+    for (const auto &topic : removed) {
+      topics_.erase(topic);
+      pending_.erase(topic);
+      static_changed |= static_.erase(topic) > 0;
+      RCLCPP_INFO(this->get_logger(), "Stopped aggregating %s", topic.c_str());
+    }
+    if (static_changed) {
+      publishStatic();
+    }
+  }
+
+  void ignitionPoseCallback(const ignition::msgs::Pose_V &ign_msg,
+                            const ignition::transport::MessageInfo &msg_info) {
+    tf2_msgs::msg::TFMessage tf_msg;
+    ros_gz_bridge::convert_gz_to_ros(ign_msg, tf_msg);
+
+    const std::string &topic = msg_info.Topic();
+    bool is_static = topic.size() >= 7 && topic.compare(topic.size() - 7, 7, "_static") == 0;
+
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (!topics_.count(topic)) {
+      return;
+    }
+    if (!is_static) {
+      pending_[topic] = std::move(tf_msg);
+      return;
+    }
+
+    // Static poses are resent periodically, only changes are published
+    auto it = static_.find(topic);
+    if (it != static_.end() && sameFrames(it->second, tf_msg)) {
+      return;
+    }
+    static_[topic] = std::move(tf_msg);
+    publishStatic();
+  }
+
+  void ignitionClockCallback(const ignition::msgs::Clock &ign_msg,
+                             const ignition::transport::MessageInfo &msg_info) {
+    tf2_msgs::msg::TFMessage tf_msg;
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      if (pending_.empty()) {
+        return;
+      }
+      for (auto &pending : pending_) {
+        auto &transforms = pending.second.transforms;
+        std::move(transforms.begin(), transforms.end(), std::back_inserter(tf_msg.transforms));
+      }
+      pending_.clear();
+    }
+    tf_pub_->publish(tf_msg);
+  }
+
+  void publishStatic() {
+    // Transient local keeps the last message only, so it holds every static frame
+    tf2_msgs::msg::TFMessage tf_msg;
+    for (const auto &frames : static_) {
+      tf_msg.transforms.insert(tf_msg.transforms.end(), frames.second.transforms.begin(),
+                               frames.second.transforms.end());
+    }
+    tf_static_pub_->publish(tf_msg);
+  }
+
+  static bool sameFrames(const tf2_msgs::msg::TFMessage &a, const tf2_msgs::msg::TFMessage &b) {
+    // Stamps ignored, static poses are republished with the current time
+    if (a.transforms.size() != b.transforms.size()) {
+      return false;
+    }
+    for (size_t i = 0; i < a.transforms.size(); i++) {
+      const auto &ta = a.transforms[i];
+      const auto &tb = b.transforms[i];
+      if (ta.header.frame_id != tb.header.frame_id || ta.child_frame_id != tb.child_frame_id ||
+          ta.transform != tb.transform) {
+        return false;
+      }
+    }
+    return true;
+  }
+};
+
+}  // namespace ignition_assets
+
+RCLCPP_COMPONENTS_REGISTER_NODE(ignition_assets::TfAggregator)
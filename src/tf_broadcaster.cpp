@@ -5,15 +5,19 @@
 #include <tf2_ros/static_transform_broadcaster.h>
 #include <tf2_ros/transform_broadcaster.h>
 #include <rclcpp/rclcpp.hpp>
+#include <rclcpp_components/register_node_macro.hpp>
 
 #include <memory>
 #include <string>
 
 using std::placeholders::_1;
 
+namespace ignition_assets {
+
 class FramePublisher : public rclcpp::Node {
 public:
-  FramePublisher() : Node("frame_publisher") {
+  explicit FramePublisher(const rclcpp::NodeOptions &options = rclcpp::NodeOptions())
+      : Node("frame_publisher", options) {
     this->declare_parameter<std::string>("world_frame", "");
 
     this->tfBroadcaster       = std::make_unique<tf2_ros::TransformBroadcaster>(*this);
@@ -75,9 +79,6 @@ private:
   std::unique_ptr<tf2_ros::StaticTransformBroadcaster> tfBroadcasterStatic;
 };
 
-int main(int argc, char* argv[]) {
-  rclcpp::init(argc, argv);
-  rclcpp::spin(std::make_shared<FramePublisher>());
-  rclcpp::shutdown();
-  return 0;
-}
+}  // namespace ignition_assets
+
+RCLCPP_COMPONENTS_REGISTER_NODE(ignition_assets::FramePublisher)